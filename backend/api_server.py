@@ -16,29 +16,87 @@ Environment Variables:
     CORS_ORIGINS - Comma-separated allowed origins or "*" for all (default: "*")
 """
 
-from flask import Flask, request, jsonify
+# Patch the standard library for cooperative I/O before anything opens sockets
+from gevent import monkey
+monkey.patch_all()
+
+from flask import Flask, request, jsonify, make_response
+from flask.json.provider import JSONProvider
 from flask_cors import CORS
+from werkzeug.exceptions import RequestEntityTooLarge
+import orjson
+import blake3
+from cachetools import TTLCache, cached
 import os
-import base64
+import pybase64 as base64
 from PIL import Image
 import io
 from dotenv import load_dotenv
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import logging
+import logging.handlers
+import queue
+import atexit
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from src.conversational_agent import AgentAPI
 
 # Load environment variables from .env file
 load_dotenv()
 
 # Configure logging for production
+# Records are handed to a queue and written to stderr by a background listener,
+# so request handlers never block on log I/O
+_log_queue = queue.SimpleQueue()
+_log_handler = logging.StreamHandler()
+_log_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+log_listener = logging.handlers.QueueListener(_log_queue, _log_handler)
+log_listener.start()
+atexit.register(log_listener.stop)
 logging.basicConfig(
     level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    handlers=[logging.handlers.QueueHandler(_log_queue)]
 )
 logger = logging.getLogger(__name__)
+logger.info(f"Base64 decoding backend: {base64.get_simd_name()}")
+
+class ORJSONProvider(JSONProvider):
+    """Flask JSON provider backed by orjson (faster, and serializes numpy scalars/arrays)."""
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
 
 # Initialize Flask app
 app = Flask(__name__)
+app.json = ORJSONProvider(app)
+
+# Image limits: cap upload/download size (checked before decoding) and let PIL
+# reject decompression bombs
+MAX_IMAGE_BYTES = 10 * 1024 * 1024
+MAX_B64_LEN = MAX_IMAGE_BYTES * 4 // 3 + 4
+# Each image costs a fetch/decode and a vision call, so bound how many one request may carry
+MAX_IMAGES = 4
+Image.MAX_IMAGE_PIXELS = 25_000_000
+# Formats accepted from clients (also skips probing every other PIL codec)
+IMAGE_FORMATS = ['JPEG', 'PNG', 'WEBP', 'GIF']
+
+# Bound request bodies: one max-size base64 image plus room for the rest of the JSON
+app.config['MAX_CONTENT_LENGTH'] = MAX_B64_LEN + 1024 * 1024
+
+# Shared HTTP session for remote image fetches (keep-alive avoids a TLS handshake per request)
+_http = requests.Session()
+_http_adapter = HTTPAdapter(
+    pool_connections=20,
+    pool_maxsize=100,
+    max_retries=Retry(total=2, backoff_factor=0.1)
+)
+_http.mount('http://', _http_adapter)
+_http.mount('https://', _http_adapter)
 
 # Configure CORS based on environment variable
 # Default is "*" for easy deployment, but can be restricted via CORS_ORIGINS env var
@@ -53,23 +111,91 @@ else:
 
 # Lazy-initialize the conversational agent to avoid long startup times
 # on platforms that require quick port binding (e.g., Render)
+# With preload_app (see gunicorn_conf.py) it is built once in the master and shared with workers
 agent = None
+_agent_lock = threading.Lock()
 
 def get_agent():
     global agent
     if agent is None:
-        # Clear any cached models to free memory
-        import gc
-        gc.collect()
-        
-        agent = AgentAPI()
-        logger.info("Conversational agent initialized successfully (lazy)")
-        
-        # Force garbage collection after model loading
-        gc.collect()
+        # Initialization yields on network I/O, so guard against concurrent requests building twice
+        with _agent_lock:
+            if agent is None:
+                # Clear any cached models to free memory
+                import gc
+                gc.collect()
+
+                agent = AgentAPI()
+                logger.info("Conversational agent initialized successfully (lazy)")
+
+                # Force garbage collection after model loading
+                gc.collect()
     return agent
 
-@app.route('/api/chat', methods=['POST', 'OPTIONS'])
+class ImageTooLargeError(ValueError):
+    """Raised when an uploaded or remote image exceeds MAX_IMAGE_BYTES."""
+
+
+def load_image(image_data: str):
+    """
+    Decode one image input in memory.
+
+    Supports base64 data URLs, remote URLs, or raw base64.
+
+    Returns:
+        Raw JPEG bytes (passed through untouched) or a decoded PIL Image whose
+        `info['blake3']` holds the digest of the original bytes (the agent's cache key)
+
+    Raises:
+        ImageTooLargeError: If the image exceeds MAX_IMAGE_BYTES
+    """
+    # Case 1: Data URL format (e.g., "data:image/jpeg;base64,...")
+    if isinstance(image_data, str) and image_data.startswith('data:image'):
+        logger.debug("Processing data URL image")
+        image_data = image_data.split(',')[1]
+        if len(image_data) > MAX_B64_LEN:
+            raise ImageTooLargeError('Image exceeds 10 MB limit')
+        image_bytes = base64.b64decode(image_data)
+
+    # Case 2: Remote image URL
+    elif isinstance(image_data, str) and image_data.startswith(('http://', 'https://')):
+        logger.debug("Fetching remote image from URL")
+        resp = _http.get(image_data, timeout=(3.05, 10), stream=True)
+        resp.raise_for_status()
+        # Read in chunks with a hard cap instead of buffering an unbounded body
+        content = bytearray()
+        for chunk in resp.iter_content(64 * 1024):
+            content.extend(chunk)
+            if len(content) > MAX_IMAGE_BYTES:
+                resp.close()
+                raise ImageTooLargeError('Remote image exceeds 10 MB limit')
+        image_bytes = bytes(content)
+
+    # Case 3: Raw base64 string
+    else:
+        logger.debug("Processing raw base64 image")
+        if len(image_data) > MAX_B64_LEN:
+            raise ImageTooLargeError('Image exceeds 10 MB limit')
+        image_bytes = base64.b64decode(image_data)
+
+    # Opening only parses the header (validates the image, checks pixel limits)
+    image = Image.open(io.BytesIO(image_bytes), formats=IMAGE_FORMATS)
+    if image.format == 'JPEG':
+        # Already what the agent sends to Gemini: pass the original bytes
+        # through and skip the decode + re-encode round trip
+        return image_bytes
+    # Force decode now, before the underlying buffer goes away
+    image.load()
+    # Hashing the upload is far cheaper than hashing the decoded pixels later
+    image.info['blake3'] = blake3.blake3(image_bytes).digest()
+    return image
+
+
+# Multiple images in one request are fetched/decoded concurrently (greenlets under gevent)
+_image_pool = ThreadPoolExecutor(max_workers=8)
+
+# CORS preflight (OPTIONS) is answered by Flask's automatic OPTIONS handling + flask-cors
+@app.route('/api/chat', methods=['POST'])
 def chat():
     """
     Main chat endpoint for conversational AI interactions.
@@ -77,12 +203,14 @@ def chat():
     Accepts:
         - Text queries for product search
         - Image uploads (base64 or URL) for visual product search
+        - Multiple images in one request (searched as a single batch)
         - Optional filters (price range, rating, category)
 
     Request Body (JSON):
         {
             "message": "user query text",
             "image": "data:image/jpeg;base64,..." or "http://...",  // optional
+            "images": ["data:image/jpeg;base64,...", "http://..."],  // optional
             "filters": {  // optional
                 "min_price": float,
                 "max_price": float,
@@ -94,73 +222,54 @@ def chat():
     Returns:
         JSON response with agent reply, products, and suggestions
     """
-    # Handle CORS preflight requests
-    if request.method == 'OPTIONS':
-        return '', 204
-
     try:
-        data = request.json
+        # Parse the raw body directly (Werkzeug enforces MAX_CONTENT_LENGTH; nothing is cached on the request)
+        data = orjson.loads(request.get_data(cache=False))
         message = data.get('message', '')
         filters = data.get('filters', {})
 
-        # Process image if provided (supports base64 data URLs, remote URLs, or raw base64)
-        image_data = data.get('image') or data.get('imageUrl')
-        image_path = None
+        # Process images if provided (decoded in memory and handed to the agent directly)
+        images_field = data.get('images') or []
+        if not isinstance(images_field, list) or not all(isinstance(i, str) for i in images_field):
+            return jsonify({'error': "'images' must be a list of strings"}), 400
+        image_inputs = list(images_field)
+        single_image = data.get('image') or data.get('imageUrl')
+        if single_image:
+            image_inputs.insert(0, single_image)
+        if len(image_inputs) > MAX_IMAGES:
+            return jsonify({'error': f'At most {MAX_IMAGES} images per request'}), 400
+        image = None
 
-        if image_data:
+        if image_inputs:
             try:
-                # Ensure temp directory exists for image storage
-                os.makedirs('temp', exist_ok=True)
-
-                # Case 1: Data URL format (e.g., "data:image/jpeg;base64,...")
-                if isinstance(image_data, str) and image_data.startswith('data:image'):
-                    logger.info("Processing data URL image")
-                    image_data = image_data.split(',')[1]
-                    image_bytes = base64.b64decode(image_data)
-                    image = Image.open(io.BytesIO(image_bytes))
-                    image_path = 'temp/uploaded_image.jpg'
-                    image.save(image_path, 'JPEG')
-
-                # Case 2: Remote image URL
-                elif isinstance(image_data, str) and image_data.startswith(('http://', 'https://')):
-                    logger.info(f"Fetching remote image from URL")
-                    resp = requests.get(image_data, timeout=10)
-                    resp.raise_for_status()
-                    content = resp.content
-                    image = Image.open(io.BytesIO(content))
-                    image_path = 'temp/uploaded_image.jpg'
-                    image.save(image_path, 'JPEG')
-
-                # Case 3: Raw base64 string
-                else:
-                    logger.info("Processing raw base64 image")
-                    image_bytes = base64.b64decode(image_data)
-                    image = Image.open(io.BytesIO(image_bytes))
-                    image_path = 'temp/uploaded_image.jpg'
-                    image.save(image_path, 'JPEG')
-
+                images = list(_image_pool.map(load_image, image_inputs))
+                image = images[0] if len(images) == 1 else images
+            except ImageTooLargeError as e:
+                return jsonify({'error': str(e)}), 413
             except Exception as e:
                 logger.error(f"Image processing failed: {str(e)}")
                 return jsonify({'error': f'Image processing failed: {str(e)}'}), 400
 
         # Process message with conversational agent
-        logger.info(f"Processing chat request - Message length: {len(message)}, Has image: {image_path is not None}")
-        response = get_agent().chat(message, image_path, **filters)
-
-        # Clean up temporary image file
-        if image_path and os.path.exists(image_path):
-            try:
-                os.remove(image_path)
-                logger.debug(f"Cleaned up temporary image: {image_path}")
-            except Exception as e:
-                logger.warning(f"Failed to clean up temp image: {str(e)}")
+        logger.debug("Processing chat request - Message length: %d, Images: %d", len(message), len(image_inputs))
+        response = get_agent().chat(message, image, **filters)
 
         return jsonify(response)
 
+    except RequestEntityTooLarge:
+        return jsonify({'error': 'Request body too large'}), 413
     except Exception as e:
         logger.error(f"Chat endpoint error: {str(e)}", exc_info=True)
         return jsonify({'error': str(e)}), 500
 
+# Agent info only changes on redeploy, so serve it from memory (and let clients cache it)
+AGENT_INFO_TTL = 60
+
+@cached(cache=TTLCache(maxsize=1, ttl=AGENT_INFO_TTL))
+def _agent_info_json() -> str:
+    """Serialized agent info, memoized for AGENT_INFO_TTL seconds."""
+    return app.json.dumps(get_agent().get_info())
+
 @app.route('/api/agent/info', methods=['GET'])
 def agent_info():
     """
@@ -170,8 +279,10 @@ def agent_info():
         JSON with agent name, description, capabilities, categories, and product count
     """
     try:
-        info = get_agent().get_info()
-        return jsonify(info)
+        response = make_response(_agent_info_json())
+        response.mimetype = 'application/json'
+        response.headers['Cache-Control'] = f'public, max-age={AGENT_INFO_TTL}'
+        return response
     except Exception as e:
         logger.error(f"Agent info endpoint error: {str(e)}", exc_info=True)
         return jsonify({'error': str(e)}), 500
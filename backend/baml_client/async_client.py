@@ -109,6 +109,21 @@ class BamlAsyncClient:
                 "product": product,"user_query": user_query,
             })
             return typing.cast(str, result.cast_to(types, types, stream_types, False, __runtime__))
+    async def ExplainRecommendationsBatch(self, products: str,user_query: str,
+        baml_options: BamlCallOptions = {},
+    ) -> typing.List[str]:
+        # Check if on_tick is provided
+        if 'on_tick' in baml_options:
+            # Use streaming internally when on_tick is provided
+            stream = self.stream.ExplainRecommendationsBatch(products=products,user_query=user_query,
+                baml_options=baml_options)
+            return await stream.get_final_response()
+        else:
+            # Original non-streaming code
+            result = await self.__options.merge_options(baml_options).call_function_async(function_name="ExplainRecommendationsBatch", args={
+                "products": products,"user_query": user_query,
+            })
+            return typing.cast(typing.List[str], result.cast_to(types, types, stream_types, False, __runtime__))
     async def GenerateProductRecommendations(self, user_query: str,retrieved_products: str,
         baml_options: BamlCallOptions = {},
     ) -> str:
@@ -187,6 +202,18 @@ class BamlStreamClient:
           lambda x: typing.cast(str, x.cast_to(types, types, stream_types, False, __runtime__)),
           ctx,
         )
+    def ExplainRecommendationsBatch(self, products: str,user_query: str,
+        baml_options: BamlCallOptions = {},
+    ) -> baml_py.BamlStream[typing.List[str], typing.List[str]]:
+        ctx, result = self.__options.merge_options(baml_options).create_async_stream(function_name="ExplainRecommendationsBatch", args={
+            "products": products,"user_query": user_query,
+        })
+        return baml_py.BamlStream[typing.List[str], typing.List[str]](
+          result,
+          lambda x: typing.cast(typing.List[str], x.cast_to(types, types, stream_types, True, __runtime__)),
+          lambda x: typing.cast(typing.List[str], x.cast_to(types, types, stream_types, False, __runtime__)),
+          ctx,
+        )
     def GenerateProductRecommendations(self, user_query: str,retrieved_products: str,
         baml_options: BamlCallOptions = {},
     ) -> baml_py.BamlStream[str, str]:
@@ -245,6 +272,13 @@ class BamlHttpRequestClient:
             "product": product,"user_query": user_query,
         }, mode="request")
         return result
+    async def ExplainRecommendationsBatch(self, products: str,user_query: str,
+        baml_options: BamlCallOptions = {},
+    ) -> baml_py.baml_py.HTTPRequest:
+        result = await self.__options.merge_options(baml_options).create_http_request_async(function_name="ExplainRecommendationsBatch", args={
+            "products": products,"user_query": user_query,
+        }, mode="request")
+        return result
     async def GenerateProductRecommendations(self, user_query: str,retrieved_products: str,
         baml_options: BamlCallOptions = {},
     ) -> baml_py.baml_py.HTTPRequest:
@@ -288,6 +322,13 @@ class BamlHttpStreamRequestClient:
             "product": product,"user_query": user_query,
         }, mode="stream")
         return result
+    async def ExplainRecommendationsBatch(self, products: str,user_query: str,
+        baml_options: BamlCallOptions = {},
+    ) -> baml_py.baml_py.HTTPRequest:
+        result = await self.__options.merge_options(baml_options).create_http_request_async(function_name="ExplainRecommendationsBatch", args={
+            "products": products,"user_query": user_query,
+        }, mode="stream")
+        return result
     async def GenerateProductRecommendations(self, user_query: str,retrieved_products: str,
         baml_options: BamlCallOptions = {},
     ) -> baml_py.baml_py.HTTPRequest:
@@ -36,6 +36,12 @@ class LlmResponseParser:
         result = self.__options.merge_options(baml_options).parse_response(function_name="ExplainRecommendation", llm_response=llm_response, mode="request")
         return typing.cast(str, result)
 
+    def ExplainRecommendationsBatch(
+        self, llm_response: str, baml_options: BamlCallOptions = {},
+    ) -> typing.List[str]:
+        result = self.__options.merge_options(baml_options).parse_response(function_name="ExplainRecommendationsBatch", llm_response=llm_response, mode="request")
+        return typing.cast(typing.List[str], result)
+
     def GenerateProductRecommendations(
         self, llm_response: str, baml_options: BamlCallOptions = {},
     ) -> str:
@@ -74,6 +80,12 @@ class LlmStreamParser:
         result = self.__options.merge_options(baml_options).parse_response(function_name="ExplainRecommendation", llm_response=llm_response, mode="stream")
         return typing.cast(str, result)
 
+    def ExplainRecommendationsBatch(
+        self, llm_response: str, baml_options: BamlCallOptions = {},
+    ) -> typing.List[str]:
+        result = self.__options.merge_options(baml_options).parse_response(function_name="ExplainRecommendationsBatch", llm_response=llm_response, mode="stream")
+        return typing.cast(typing.List[str], result)
+
     def GenerateProductRecommendations(
         self, llm_response: str, baml_options: BamlCallOptions = {},
     ) -> str:
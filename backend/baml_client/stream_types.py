@@ -30,6 +30,7 @@ class AgentDirective(BaseModel):
     intent: typing.Optional[types.ConversationType] = None
     reply: typing.Optional[str] = None
     refined_query: typing.Optional[str] = None
+    reply_template: typing.Optional[str] = None
     min_price: typing.Optional[float] = None
     max_price: typing.Optional[float] = None
     min_rating: typing.Optional[float] = None
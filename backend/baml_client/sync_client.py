@@ -119,6 +119,20 @@ class BamlSyncClient:
                 "product": product,"user_query": user_query,
             })
             return typing.cast(str, result.cast_to(types, types, stream_types, False, __runtime__))
+    def ExplainRecommendationsBatch(self, products: str,user_query: str,
+        baml_options: BamlCallOptions = {},
+    ) -> typing.List[str]:
+        # Check if on_tick is provided
+        if 'on_tick' in baml_options:
+            stream = self.stream.ExplainRecommendationsBatch(products=products,user_query=user_query,
+                baml_options=baml_options)
+            return stream.get_final_response()
+        else:
+            # Original non-streaming code
+            result = self.__options.merge_options(baml_options).call_function_sync(function_name="ExplainRecommendationsBatch", args={
+                "products": products,"user_query": user_query,
+            })
+            return typing.cast(typing.List[str], result.cast_to(types, types, stream_types, False, __runtime__))
     def GenerateProductRecommendations(self, user_query: str,retrieved_products: str,
         baml_options: BamlCallOptions = {},
     ) -> str:
@@ -194,6 +208,18 @@ class BamlStreamClient:
           lambda x: typing.cast(str, x.cast_to(types, types, stream_types, False, __runtime__)),
           ctx,
         )
+    def ExplainRecommendationsBatch(self, products: str,user_query: str,
+        baml_options: BamlCallOptions = {},
+    ) -> baml_py.BamlSyncStream[typing.List[str], typing.List[str]]:
+        ctx, result = self.__options.merge_options(baml_options).create_sync_stream(function_name="ExplainRecommendationsBatch", args={
+            "products": products,"user_query": user_query,
+        })
+        return baml_py.BamlSyncStream[typing.List[str], typing.List[str]](
+          result,
+          lambda x: typing.cast(typing.List[str], x.cast_to(types, types, stream_types, True, __runtime__)),
+          lambda x: typing.cast(typing.List[str], x.cast_to(types, types, stream_types, False, __runtime__)),
+          ctx,
+        )
     def GenerateProductRecommendations(self, user_query: str,retrieved_products: str,
         baml_options: BamlCallOptions = {},
     ) -> baml_py.BamlSyncStream[str, str]:
@@ -252,6 +278,13 @@ class BamlHttpRequestClient:
             "product": product,"user_query": user_query,
         }, mode="request")
         return result
+    def ExplainRecommendationsBatch(self, products: str,user_query: str,
+        baml_options: BamlCallOptions = {},
+    ) -> baml_py.baml_py.HTTPRequest:
+        result = self.__options.merge_options(baml_options).create_http_request_sync(function_name="ExplainRecommendationsBatch", args={
+            "products": products,"user_query": user_query,
+        }, mode="request")
+        return result
     def GenerateProductRecommendations(self, user_query: str,retrieved_products: str,
         baml_options: BamlCallOptions = {},
     ) -> baml_py.baml_py.HTTPRequest:
@@ -295,6 +328,13 @@ class BamlHttpStreamRequestClient:
             "product": product,"user_query": user_query,
         }, mode="stream")
         return result
+    def ExplainRecommendationsBatch(self, products: str,user_query: str,
+        baml_options: BamlCallOptions = {},
+    ) -> baml_py.baml_py.HTTPRequest:
+        result = self.__options.merge_options(baml_options).create_http_request_sync(function_name="ExplainRecommendationsBatch", args={
+            "products": products,"user_query": user_query,
+        }, mode="stream")
+        return result
     def GenerateProductRecommendations(self, user_query: str,retrieved_products: str,
         baml_options: BamlCallOptions = {},
     ) -> baml_py.baml_py.HTTPRequest:
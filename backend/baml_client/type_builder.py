@@ -115,7 +115,7 @@ class AgentDirectiveAst:
     def __init__(self, tb: type_builder.TypeBuilder):
         _tb = tb._tb # type: ignore (we know how to use this private attribute)
         self._bldr = _tb.class_("AgentDirective")
-        self._properties: typing.Set[str] = set([  "intent",  "reply",  "refined_query",  "min_price",  "max_price",  "min_rating",  "category",  ])
+        self._properties: typing.Set[str] = set([  "intent",  "reply",  "refined_query",  "reply_template",  "min_price",  "max_price",  "min_rating",  "category",  ])
         self._props = AgentDirectiveProperties(self._bldr, self._properties)
 
     def type(self) -> baml_py.FieldType:
@@ -155,6 +155,10 @@ class AgentDirectiveProperties:
     def refined_query(self) -> type_builder.ClassPropertyViewer:
         return type_builder.ClassPropertyViewer(self.__bldr.property("refined_query"))
     
+    @property
+    def reply_template(self) -> type_builder.ClassPropertyViewer:
+        return type_builder.ClassPropertyViewer(self.__bldr.property("reply_template"))
+    
     @property
     def min_price(self) -> type_builder.ClassPropertyViewer:
         return type_builder.ClassPropertyViewer(self.__bldr.property("min_price"))
@@ -53,6 +53,7 @@ class AgentDirective(BaseModel):
     intent: ConversationType
     reply: typing.Optional[str] = None
     refined_query: typing.Optional[str] = None
+    reply_template: typing.Optional[str] = None
     min_price: typing.Optional[float] = None
     max_price: typing.Optional[float] = None
     min_rating: typing.Optional[float] = None
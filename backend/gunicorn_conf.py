@@ -0,0 +1,70 @@
+"""
+Gunicorn configuration for the Cartly API server.
+
+The API spends nearly all of its wall-clock time waiting on network I/O
+(Gemini, Pinecone, remote image downloads), so gevent workers are used to
+serve many concurrent requests per process.
+
+Usage:
+    gunicorn -c gunicorn_conf.py api_server:app
+
+Environment Variables:
+    PORT - Port to bind (default: 8080)
+    WEB_CONCURRENCY - Number of worker processes (default: 1). Each worker holds
+                      its own copy of the embedding model's working memory,
+                      caches and catalog (hundreds of MB once its pages
+                      diverge from the preloaded master), so raise it only when
+                      the container has memory to spare
+    GUNICORN_WORKER_CONNECTIONS - Max concurrent greenlets per worker (default: 1000)
+    TORCH_NUM_THREADS - Torch threads per worker for query embedding (default: 1,
+                        so workers don't contend for cores)
+"""
+
+import gc
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8080')}"
+
+# Async workers: one greenlet per request, cooperative on socket I/O.
+# Note: BAML calls and torch forward passes are not gevent-aware and block the
+# worker's hub while they run; for more LLM-bound concurrency raise
+# WEB_CONCURRENCY, memory permitting.
+worker_class = "gevent"
+# Conservative default: memory, not CPU, is the limit on small containers
+workers = int(os.getenv('WEB_CONCURRENCY', 1))
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', 1000))
+
+# LLM + vision round trips can be slow; keep the previous 120s ceiling
+timeout = 120
+
+# Worker heartbeat files live in RAM rather than on (possibly slow) container disk
+worker_tmp_dir = '/dev/shm'
+
+# Recycle workers periodically to bound memory growth from the embedding model
+max_requests = 500
+max_requests_jitter = 200
+
+# Import the app in the master so the embedding model and catalog are loaded
+# once and shared with forked workers via copy-on-write
+preload_app = True
+
+
+def when_ready(server):
+    """
+    Load and warm up the agent in the master before workers are forked.
+    Only fork-safe state is built here (embedding model, catalog); network
+    clients such as Pinecone's are created lazily in each worker.
+    """
+    # Server default only (set before the model loads); offline indexing keeps torch's default
+    os.environ.setdefault('TORCH_NUM_THREADS', '1')
+    from api_server import get_agent
+    get_agent().warm_up()
+    # Move loaded objects out of GC tracking so collections in workers don't
+    # touch (and un-share) their pages
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    """Restart the log queue listener in each worker (threads don't survive fork)."""
+    from api_server import log_listener
+    log_listener.start()
@@ -20,112 +20,495 @@ Key Flow:
 """
 
 import os
-import base64
-from typing import Dict, List, Optional, Union
-from PIL import Image
+import re
+import orjson
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+from PIL import Image, ImageOps
 import io
 import logging
+import threading
+import blake3
+import numpy as np
+from cachetools import LRUCache
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import google.generativeai as genai
 from baml_client import b
 from src.search_engine import SearchEngine
+from src.semantic_cache import SemanticCache
 
 load_dotenv()
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# Structured "Field: value" lines of a Gemini Vision image description (optional "- " bullet)
+_DESC_RE = re.compile(
+    r'(?im)^[\s\-]*(product type|category|target audience|main colors|key features|material|brand|logo)\s*:\s*(.+)$'
+)
+
+
+@lru_cache(maxsize=128)
+def _parse_description(image_description: str) -> Dict[str, str]:
+    """Parse an image description into {field: value} in one pass (first occurrence wins)."""
+    fields = {}
+    for key, value in _DESC_RE.findall(image_description or ''):
+        fields.setdefault(key.lower(), value.strip())
+    return fields
+
+
+def _format_products_for_context(products: List[Dict]) -> str:
+    """
+    Compact JSON lines (fixed key order) for the RAG prompt. The prompt puts this
+    dynamic block last, so the static instructions form a stable cacheable prefix.
+    """
+    return '\n'.join(
+        orjson.dumps({
+            'i': i,
+            'title': product['title'],
+            'category': product.get('category'),
+            'store': product.get('store'),
+            'description': (product.get('description') or '')[:200],
+            'price': product.get('price') or 0,
+            'rating': product.get('rating') or 0,
+            'rating_count': product.get('rating_count') or 0
+        }).decode()
+        for i, product in enumerate(products, 1)
+    )
+
+
+def _token_jaccard(a: str, b: str) -> float:
+    """Word-set overlap between two queries (1.0 = same words, case-insensitive)."""
+    tokens_a, tokens_b = set(a.lower().split()), set(b.lower().split())
+    union = tokens_a | tokens_b
+    return len(tokens_a & tokens_b) / len(union) if union else 1.0
+
+
+def _simplify_audience(audience: Optional[str]) -> Optional[str]:
+    """Map a free-form target audience to a catalog audience term."""
+    if not audience:
+        return None
+    audience = audience.lower()
+    if 'women' in audience or 'female' in audience:
+        return "women's"
+    elif 'men' in audience or 'male' in audience:
+        return "men's"
+    elif 'kid' in audience or 'child' in audience:
+        return "kids"
+    return None
+
+
+# Numbers in a message (prices, ratings) must match exactly for a response cache hit
+_NUMBER_RE = re.compile(r'\d+(?:\.\d+)?')
+
+# Attributes that flip the answer while barely moving the query embedding
+# ("men's" vs "women's", "red" vs "blue"); cache namespaces include them
+_ATTRIBUTE_RE = re.compile(
+    r"\b(men|man|male|women|woman|female|boys?|girls?|kids?|child(?:ren)?|bab(?:y|ies)|toddlers?|unisex|"
+    r"red|blue|green|black|white|yellow|orange|purple|pink|brown|gr[ae]y|silver|gold|beige|navy|teal|maroon)"
+    r"(?:'?s)?\b",
+    re.IGNORECASE
+)
+
+
+def _exact_terms(message: str) -> str:
+    """Numbers and answer-changing attribute words of a query, for cache namespaces."""
+    attributes = sorted({m.lower() for m in _ATTRIBUTE_RE.findall(message)})
+    return f"{','.join(_NUMBER_RE.findall(message))}|{','.join(attributes)}"
+
+# A completed "Target Audience:" line ends the part of a vision answer that search uses
+_VISION_DONE_RE = re.compile(r'(?im)^[\s\-]*target audience\s*:[^\n]*\n')
+
+# Follow-up suggestion triggers (whole words/phrases, so e.g. "helpless" isn't "help")
+_IDENTITY_KWS_RE = re.compile(r'\b(?:name|who|what are you)\b', re.IGNORECASE)
+_HELP_KWS_RE = re.compile(r'\b(?:help|can you|what can)\b', re.IGNORECASE)
+
+# Static follow-up suggestions (immutable, shared by all responses)
+_FOLLOWUPS_IDENTITY = (
+    "What products are you shopping for today?",
+    "Would you like to upload an image to find similar products?",
+    "What categories interest you most?"
+)
+_FOLLOWUPS_HELP = (
+    "Try asking: 'Find me wireless headphones'",
+    "Upload a product image for visual search",
+    "Ask about specific categories like electronics or clothing"
+)
+_FOLLOWUPS_DEFAULT = (
+    "What can I help you find today?",
+    "Would you like product recommendations?",
+    "Need help with a specific category?"
+)
+_FOLLOWUPS_NO_RESULTS = (
+    "Try different keywords",
+    "Upload an image of what you're looking for",
+    "Ask about our available categories"
+)
+
+# HandleUserQuery's reply_template is written before retrieval; only trust it
+# (and skip GenerateProductRecommendations) when the best match is at least this close
+TEMPLATE_MIN_SIMILARITY = 0.5
+
+# Max Hamming distance (of 64 bits) for two images to count as the same photo
+PHASH_MAX_DISTANCE = 6
+
+
+def _dhash(image_data: bytes) -> int:
+    """64-bit difference hash of an image (robust to re-encoding and resizing)."""
+    img = Image.open(io.BytesIO(image_data))
+    img.draft('L', (64, 64))
+    pixels = np.asarray(img.convert('L').resize((9, 8), Image.Resampling.BILINEAR), dtype=np.int16)
+    bits = (pixels[:, 1:] > pixels[:, :-1]).flatten()
+    return int(np.packbits(bits).view('>u8')[0])
+
+
+def _close_stream(response):
+    """
+    Close a Gemini streaming response that was abandoned early, releasing its
+    HTTP connection back to the REST session's pool (no-op once fully read).
+    """
+    iterator = getattr(response, '_iterator', None)
+    cancel = getattr(iterator, 'cancel', None)
+    if cancel is not None and not getattr(response, '_done', True):
+        try:
+            cancel()
+        except Exception as e:
+            logger.debug(f"Could not close vision stream: {e}")
+
+
+# Longest edge sent to Gemini Vision; larger uploads are downscaled before analysis
+VISION_MAX_EDGE = 1024
+
+
+def _make_io_pool(max_workers: int):
+    """
+    Thread pool for overlapping independent network calls (Gemini, BAML, Pinecone).
+
+    Uses native OS threads even when gevent has monkey-patched `threading`, since
+    BAML's native runtime blocks the calling thread without yielding to the hub.
+    """
+    try:
+        from gevent import monkey
+        if monkey.is_module_patched('threading'):
+            from gevent.threadpool import ThreadPoolExecutor as NativeThreadPoolExecutor
+            return NativeThreadPoolExecutor(max_workers=max_workers)
+    except ImportError:
+        pass
+    return ThreadPoolExecutor(max_workers=max_workers)
+
+
+_io_pool = _make_io_pool(int(os.getenv('AGENT_IO_THREADS', 8)))
+
+# Product catalog, resolved against the backend directory so it doesn't depend on CWD
+DEFAULT_DATA_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'processed_products.json'
+)
+
+# Heavy shared resources, created once per process however many agents exist
+_init_lock = threading.Lock()
+_SEARCH_ENGINE: Optional[SearchEngine] = None
+_VISION_MODEL = None
+
+
+def _get_search_engine(data_path: str) -> SearchEngine:
+    """Return the process-wide SearchEngine (embedding model + Pinecone client + catalog)."""
+    global _SEARCH_ENGINE
+    if _SEARCH_ENGINE is None:
+        with _init_lock:
+            if _SEARCH_ENGINE is None:
+                _SEARCH_ENGINE = SearchEngine(data_path)
+    return _SEARCH_ENGINE
+
+
+def _get_vision_model():
+    """Return the process-wide Gemini Vision model."""
+    global _VISION_MODEL
+    if _VISION_MODEL is None:
+        with _init_lock:
+            if _VISION_MODEL is None:
+                # REST transport goes through `requests`, which gevent can patch (gRPC cannot)
+                genai.configure(api_key=os.getenv('GEMINI_API_KEY'), transport='rest')
+                _tune_gemini_http_pool()
+                _VISION_MODEL = genai.GenerativeModel('gemini-2.0-flash-lite')
+    return _VISION_MODEL
+
+
+def _tune_gemini_http_pool():
+    """
+    Widen the keep-alive connection pool of Gemini's REST session so concurrent
+    vision calls (up to AGENT_IO_THREADS) reuse TLS connections instead of
+    overflowing urllib3's default 10-connection pool.
+
+    Relies on the REST transport's requests session, so failures only log.
+    (BAML's HTTP client lives in its Rust runtime and pools connections itself.)
+    """
+    try:
+        from google.generativeai import client as genai_client
+        session = genai_client.get_default_generative_client()._transport._session
+        session.mount('https://', HTTPAdapter(
+            pool_connections=16,
+            pool_maxsize=32,
+            max_retries=Retry(total=2, backoff_factor=0.1)
+        ))
+    except Exception as e:
+        logger.warning(f"Could not tune Gemini HTTP pool: {e}")
+
+
 class ConversationalAgent:
     """
     Unified AI agent that handles general conversation, text-based product recommendations,
     and image-based product search for a commerce website.
     """
     
+    # Search filters the BAML directive can extract from a message
+    _FILTER_FIELDS: Tuple[str, ...] = ('min_price', 'max_price', 'min_rating', 'category')
+    
     def __init__(self):
         """Initialize the conversational agent with search capabilities."""
-        data_path = os.path.join('data', 'processed_products.json')
-        self.search_engine = None  # Lazy load
-        self.data_path = data_path
+        self.search_engine = None  # Lazy load (process-wide singleton)
+        self.data_path = DEFAULT_DATA_PATH
         
-        # Initialize Gemini for image analysis (lazy load)
-        self.genai_configured = False
+        # Gemini for image analysis (lazy load, process-wide singleton)
         self.vision_model = None
         
+        # Catalog categories (computed on first use)
+        self._cached_categories: Optional[List[str]] = None
+        self._info_cache: Optional[Dict] = None
+        
+        # Semantic caches for whole responses and for individual BAML calls
+        # (lazy load, share the search engine's embedding model)
+        self.response_cache = None
+        self.llm_cache = None
+        self._embed = None
+        
+        # Image descriptions and downscaled uploads keyed by content hash
+        # (re-uploads skip Gemini Vision and the resize)
+        self._image_desc_cache = LRUCache(maxsize=500)
+        self._prepared_cache = LRUCache(maxsize=64)
+        self._image_phash_cache = LRUCache(maxsize=512)
+        self._image_desc_lock = threading.Lock()
+        
+        # Per-thread reusable encode buffers
+        self._tls = threading.local()
+        
         # Agent identity
         self.agent_name = "Cartly"
         self.agent_description = "AI Shopping Assistant"
+        
+        # Optionally load models in the background so the first message doesn't pay for it
+        # (off by default to keep memory-constrained deployments lazy)
+        if os.getenv('EAGER_LOAD') == '1':
+            self._warmup = threading.Thread(target=self._warmup_models, daemon=True)
+            self._warmup.start()
+    
+    def _warmup_models(self):
+        """Load the search engine and vision model ahead of the first request."""
+        try:
+            self._ensure_search_engine()
+            self._ensure_vision_model()
+            logger.info("Agent models loaded in background")
+        except Exception as e:
+            logger.warning(f"Background model loading failed: {e}")
     
     def _ensure_search_engine(self):
         """Lazy load search engine to save memory."""
         if self.search_engine is None:
-            from src.search_engine import SearchEngine
-            self.search_engine = SearchEngine(self.data_path)
+            self.search_engine = _get_search_engine(self.data_path)
+    
+    def _ensure_response_cache(self):
+        """Lazy load the semantic response cache and the per-call LLM cache."""
+        self._ensure_search_engine()
+        if self.response_cache is None:
+            # Both caches embed the same message on a turn; memoize so it's encoded once
+            self._embed = lru_cache(maxsize=256)(self.search_engine.embed_query)
+            self.llm_cache = SemanticCache(
+                self._embed,
+                threshold=float(os.getenv('LLM_CACHE_THRESHOLD', 0.95)),
+                maxsize=1000,
+                ttl=3600
+            )
+            self.response_cache = SemanticCache(
+                self._embed,
+                threshold=float(os.getenv('RESPONSE_CACHE_THRESHOLD', 0.95)),
+                maxsize=1000,
+                ttl=3600
+            )
+    
+    def _cached_call(self, fn_name: str, key_text: str, call, namespace: str = ''):
+        """
+        Run a BAML call through the semantic LLM cache.
+
+        Args:
+            fn_name: BAML function name (calls to different functions never share entries)
+            key_text: Text whose meaning determines the result (e.g. the user message)
+            call: Zero-argument callable making the actual LLM call
+            namespace: Extra exact-match key for data the result depends on (e.g. product IDs)
+
+        Returns:
+            Cached or freshly computed call result
+        """
+        if not key_text or not key_text.strip():
+            return call()
+        namespace = f"{fn_name}|{namespace}"
+        try:
+            self._ensure_response_cache()
+            cached, embedding = self.llm_cache.lookup(key_text, namespace)
+        except Exception as e:
+            logger.warning(f"LLM cache lookup failed: {e}")
+            return call()
+        if cached is not None:
+            return cached
+
+        result = call()
+        self.llm_cache.store(key_text, embedding, result, namespace)
+        return result
+    
+    def _cached_response(self, key_text: str, namespace: str, handler, use_cache: bool = True) -> Dict:
+        """
+        Run a search handler through the semantic response cache.
+
+        Args:
+            key_text: Text the results are retrieved for (refined query, or the message for image turns)
+            namespace: Exact-match key for everything else the results depend on (filters, images)
+            handler: Zero-argument callable producing the response
+            use_cache: Skip the cache when False
+
+        Returns:
+            Cached or freshly computed response
+        """
+        if not use_cache or not key_text or not key_text.strip():
+            return handler()
+        try:
+            self._ensure_response_cache()
+            cached, embedding = self.response_cache.lookup(key_text, namespace)
+        except Exception as e:
+            logger.warning(f"Response cache lookup failed: {e}")
+            return handler()
+        if cached is not None:
+            return cached
+
+        response = handler()
+        # Errors and empty product results may be transient; only cache real answers
+        if response.get('type') != 'error' and response.get('products'):
+            self.response_cache.store(key_text, embedding, response, namespace)
+        return response
+
+    @staticmethod
+    def _search_namespace(query: str, filters: Optional[Dict]) -> str:
+        """Response cache partition for a text search: filters plus numbers/attributes of the query."""
+        return f"search|{orjson.dumps(filters or {}, option=orjson.OPT_SORT_KEYS).decode()}|{_exact_terms(query)}"
+
+    @staticmethod
+    def _image_namespace(images: List, filters: Optional[Dict]) -> str:
+        """
+        Response cache partition for an image turn: the images' content and the filters.
+
+        Decoded uploads carry the BLAKE3 digest of their original bytes in
+        `img.info['blake3']` (set by the API server), so the pixel buffer is never
+        copied just to build a key; other PIL images hash their size plus a thumbnail.
+        """
+        hasher = blake3.blake3()
+        for img in images:
+            if isinstance(img, Image.Image):
+                digest = img.info.get('blake3')
+                if digest is None:
+                    digest = f"{img.mode}{img.size}".encode('utf-8') + img.resize((16, 16)).tobytes()
+                hasher.update(digest)
+            elif isinstance(img, bytes):
+                hasher.update(img)
+            else:
+                hasher.update(str(img).encode('utf-8'))
+        return f"image|{hasher.hexdigest()[:32]}|{orjson.dumps(filters or {}, option=orjson.OPT_SORT_KEYS).decode()}"
     
     def _ensure_vision_model(self):
         """Lazy load vision model to save memory."""
-        if not self.genai_configured:
-            genai.configure(api_key=os.getenv('GEMINI_API_KEY'))
-            self.genai_configured = True
         if self.vision_model is None:
-            self.vision_model = genai.GenerativeModel('gemini-2.0-flash-lite')
+            self.vision_model = _get_vision_model()
     
     def process_message(self, 
                        message: str, 
-                       image: Optional[Union[str, bytes, Image.Image]] = None,
-                       filters: Optional[Dict] = None) -> Dict:
+                       image: Optional[Union[str, bytes, Image.Image, List]] = None,
+                       filters: Optional[Dict] = None,
+                       no_cache: bool = False) -> Dict:
         """
         Main entry point for all agent interactions.
         
         Args:
             message: User message text
-            image: Optional image (file path, bytes, or PIL Image)
+            image: Optional image (file path, bytes, or PIL Image), or a list of images
             filters: Optional search filters
+            no_cache: Skip the semantic response cache
             
         Returns:
             Dictionary with agent response
         """
+        images = image if isinstance(image, list) else ([image] if image is not None else [])
+
+        # Image turns are answered from the images alone, so repeats (same images and
+        # filters) are served before Gemini Vision runs; text turns are cached by
+        # refined query after intent classification (see _process_message)
+        if images:
+            return self._cached_response(
+                message,
+                self._image_namespace(images, filters),
+                lambda: self._process_message(message, images, filters, use_cache=False),
+                use_cache=not no_cache
+            )
+        return self._process_message(message, images, filters, use_cache=not no_cache)
+
+    def _process_message(self, message: str, images: List, filters: Optional[Dict],
+                         use_cache: bool = True) -> Dict:
+        """Run the full agent pipeline (intent classification, vision, search) for one turn."""
         try:
+            # Start Gemini Vision right away (image turns are always IMAGE_SEARCH)
+            has_image = bool(images)
+            image_futures = [_io_pool.submit(self._describe_image, img) for img in images]
+            speculative_search = None
+
             # Ensure search engine is loaded
             self._ensure_search_engine()
-            
-            # Build single-entrypoint query for BAML
-            has_image = image is not None
-            image_description = None
-            if has_image:
-                try:
-                    image_data = self._prepare_image_for_analysis(image)
-                    image_description = self._analyze_image_content(image_data)
-                except Exception:
-                    image_description = "Product image provided"
-
-            directive = b.HandleUserQuery({
-                "user_message": message,
-                "has_image": bool(has_image),
-                "image_description": image_description
-            })
 
-            intent = directive.intent if isinstance(directive, dict) else getattr(directive, "intent", None)
-            logger.info(f"Agent intent classified: {intent}")
+            if has_image:
+                # HandleUserQuery's prompt routes every turn with an image to IMAGE_SEARCH,
+                # and image search builds its query from the description alone, so the
+                # classification call would only add latency
+                fields = {"intent": "IMAGE_SEARCH"}
+            else:
+                # Speculatively run the search most text turns end up needing
+                # (PRODUCT_RECOMMENDATION) while the intent is being classified
+                speculative_search = _io_pool.submit(self.search_engine.search, message, filters, 3)
+                directive = self._cached_call(
+                    "HandleUserQuery",
+                    message,
+                    lambda: b.HandleUserQuery({
+                        "user_message": message,
+                        "has_image": False,
+                        "image_description": None
+                    }),
+                    # Extracted price/rating filters must come from the same numbers (and audience/color)
+                    namespace=_exact_terms(message)
+                )
+                # Normalize the directive (BAML model or dict) to a field mapping once
+                fields = directive if isinstance(directive, dict) else vars(directive)
+            intent = fields.get("intent")
+            logger.info("Agent intent classified: %s", intent)
 
             # Extract filters from BAML directive (price, rating, category)
-            extracted_filters = {}
-            if hasattr(directive, 'min_price') and directive.min_price:
-                extracted_filters['min_price'] = directive.min_price
-            if hasattr(directive, 'max_price') and directive.max_price:
-                extracted_filters['max_price'] = directive.max_price
-            if hasattr(directive, 'min_rating') and directive.min_rating:
-                extracted_filters['min_rating'] = directive.min_rating
-            if hasattr(directive, 'category') and directive.category:
-                extracted_filters['category'] = directive.category
+            extracted_filters = {f: v for f in self._FILTER_FIELDS if (v := fields.get(f))}
 
             # Merge with user-provided filters (user filters take precedence)
             merged_filters = {**extracted_filters, **(filters or {})}
 
             if merged_filters:
-                logger.info(f"Applied filters: {merged_filters}")
+                logger.debug("Applied filters: %s", merged_filters)
 
             if intent == "GENERAL_CONVERSATION":
-                reply = directive.get("reply") if isinstance(directive, dict) else getattr(directive, "reply", None)
+                if speculative_search is not None:
+                    speculative_search.cancel()
+                reply = fields.get("reply")
                 if reply:
                     return {
                         'type': 'conversation',
@@ -139,22 +522,41 @@ class ConversationalAgent:
 
             # Text product recommendation
             if intent == "PRODUCT_RECOMMENDATION":
-                refined_query = directive.get("refined_query") if isinstance(directive, dict) else getattr(directive, "refined_query", None)
-                return self._handle_product_search(refined_query or message, merged_filters)
+                query = fields.get("refined_query") or message
+
+                def search():
+                    # Reuse the speculative search if it searched (nearly) the same thing
+                    results = None
+                    if (speculative_search is not None and merged_filters == (filters or {})
+                            and _token_jaccard(query, message) > 0.7):
+                        results = speculative_search.result()
+                    return self._handle_product_search(
+                        query, merged_filters, results=results, reply_template=fields.get("reply_template")
+                    )
+
+                # Keyed by what is actually searched (refined query + filters), not the raw message
+                response = self._cached_response(
+                    query, self._search_namespace(query, merged_filters), search, use_cache=use_cache
+                )
+                if speculative_search is not None:
+                    speculative_search.cancel()
+                return response
 
-            # Image search
-            if intent == "IMAGE_SEARCH":
-                refined_query = directive.get("refined_query") if isinstance(directive, dict) else getattr(directive, "refined_query", None)
-                # Pass image_description for simplification
+            # Image search (descriptions were computed once, concurrently, above)
+            if intent == "IMAGE_SEARCH" and image_futures:
+                image_descriptions = [future.result() for future in image_futures]
+                if len(images) > 1:
+                    return self._handle_multi_image_search(image_descriptions)
                 return self._handle_image_search(
-                    image,
-                    refined_query or image_description or message,
-                    merged_filters,
-                    image_description=image_description  # Pass description for query simplification
+                    image_descriptions[0],
+                    fields.get("refined_query") or message,
+                    merged_filters
                 )
 
             # Fallback
-            return self._handle_product_search(message, filters)
+            return self._handle_product_search(
+                message, filters, results=speculative_search.result() if speculative_search else None
+            )
                 
         except Exception as e:
             return {
@@ -167,7 +569,9 @@ class ConversationalAgent:
     def _handle_general_conversation(self, message: str) -> Dict:
         """Handle general conversation with the agent."""
         try:
-            response = b.HandleGeneralConversation(message)
+            response = self._cached_call(
+                "HandleGeneralConversation", message, lambda: b.HandleGeneralConversation(message)
+            )
             
             # Add follow-up suggestions based on conversation
             follow_ups = self._generate_conversation_followups(message)
@@ -191,33 +595,49 @@ class ConversationalAgent:
                 ]
             }
     
-    def _handle_product_search(self, message: str, filters: Optional[Dict] = None) -> Dict:
-        """Handle text-based product recommendations with RAG."""
+    def _handle_product_search(self,
+                               message: str,
+                               filters: Optional[Dict] = None,
+                               results: Optional[Dict] = None,
+                               reply_template: Optional[str] = None) -> Dict:
+        """
+        Handle text-based product recommendations with RAG (optionally from precomputed search results).
+
+        If HandleUserQuery already produced a reply_template and the top result is a
+        strong match (TEMPLATE_MIN_SIMILARITY), the template is filled in with the result
+        count instead of making a separate GenerateProductRecommendations call; weaker
+        matches go through GenerateProductRecommendations and its grounding rules.
+        """
         try:
             # Use existing search engine to retrieve products
-            results = self.search_engine.search(
-                message,
-                filters=filters,
-                top_k=3
-            )
+            if results is None:
+                results = self.search_engine.search(
+                    message,
+                    filters=filters,
+                    top_k=3
+                )
+            if results.get('error'):
+                # A failed search is an error, not "no products found"
+                raise RuntimeError(results['error'])
 
             # RAG: Pass retrieved products to LLM for intelligent response
-            if results['results']:
+            top_score = max((p.get('similarity_score') or 0 for p in results['results']), default=0)
+            if reply_template and '{count}' in reply_template and top_score >= TEMPLATE_MIN_SIMILARITY:
+                response_message = reply_template.replace('{count}', str(len(results['results'])))
+            elif results['results']:
                 # Format retrieved products for context
-                products_context = []
-                for idx, product in enumerate(results['results'], 1):
-                    context_item = f"{idx}. {product['title']}"
-                    if product.get('description'):
-                        context_item += f" - {product['description'][:200]}"
-                    context_item += f" (Price: ${product.get('price', 0):.2f}, Rating: {product.get('rating', 0)}/5)"
-                    products_context.append(context_item)
-
-                products_text = "\n".join(products_context)
+                products_text = _format_products_for_context(results['results'])
 
                 # Generate context-aware response using RAG
-                response_message = b.GenerateProductRecommendations(
-                    user_query=message,
-                    retrieved_products=products_text
+                # The answer depends on the retrieved products too, so they're part of the key
+                response_message = self._cached_call(
+                    "GenerateProductRecommendations",
+                    message,
+                    lambda: b.GenerateProductRecommendations(
+                        user_query=message,
+                        retrieved_products=products_text
+                    ),
+                    namespace=','.join(sorted(str(p.get('id')) for p in results['results']))
                 )
             else:
                 # No products found - provide helpful alternative response
@@ -241,37 +661,13 @@ class ConversationalAgent:
             }
     
     def _handle_image_search(self,
-                           image: Union[str, bytes, Image.Image],
+                           image_description: str,
                            refined_hint: Optional[str] = None,
-                           filters: Optional[Dict] = None,
-                           image_description: Optional[str] = None) -> Dict:
-        """Handle image-based product search."""
+                           filters: Optional[Dict] = None) -> Dict:
+        """Handle image-based product search from an already computed image description."""
         try:
-            search_query = None
-
-            # Use provided image_description or analyze image
-            if not image_description:
-                image_data = self._prepare_image_for_analysis(image)
-                image_description = self._analyze_image_content(image_data)
-
-            logger.info("Image analyzed successfully")
-
-            # Build semantic search query from image description
-            # Extract key attributes and create a rich, semantic query
-            product_type = self._extract_product_type(image_description) or "product"
-            target_audience = self._extract_target_audience(image_description)
-            category = self._extract_category(image_description)
-
-            # Build query: product_type + target_audience + category (if relevant)
-            query_parts = []
-            if target_audience:
-                query_parts.append(target_audience)
-            query_parts.append(product_type)
-            if category and category not in ['miscellaneous', 'general']:
-                query_parts.append(category)
-
-            search_query = ' '.join(query_parts)
-            logger.info(f"Image search query generated: {search_query}")
+            search_query = self._build_image_search_query(image_description)
+            logger.info("Image search query generated: %s", search_query)
 
             # Search with low threshold for better recall
             results = self.search_engine.search(
@@ -280,7 +676,9 @@ class ConversationalAgent:
                 top_k=3,
                 min_similarity=0.10  # Low threshold for image-based searches
             )
-            logger.info(f"Image search returned {len(results.get('results', []))} products")
+            if results.get('error'):
+                raise RuntimeError(results['error'])
+            logger.info("Image search returned %d products", len(results.get('results', [])))
 
             if results['results']:
                 # Generate simple message with actual count
@@ -314,25 +712,187 @@ class ConversationalAgent:
                 'error': str(e)
             }
     
+    def _handle_multi_image_search(self, image_descriptions: List[str]) -> Dict:
+        """Handle product search for several images, embedding all queries in one batch."""
+        try:
+            search_queries = [self._build_image_search_query(d) for d in image_descriptions]
+            logger.info("Image search queries generated: %s", search_queries)
+
+            # Same settings as single-image search: no filters, low threshold
+            all_results = self.search_engine.search_batch(
+                search_queries,
+                filters=None,
+                top_k=3,
+                min_similarity=0.10
+            )
+            failed = next((r['error'] for r in all_results if r.get('error')), None)
+            if failed:
+                raise RuntimeError(failed)
+
+            # Merge per-image results, keeping the first occurrence of each product
+            products = []
+            seen_ids = set()
+            for results in all_results:
+                for product in results['results']:
+                    if product.get('id') not in seen_ids:
+                        seen_ids.add(product.get('id'))
+                        products.append(product)
+
+            if products:
+                response_message = f"I found {len(products)} products for your {len(image_descriptions)} images."
+            else:
+                response_message = "I couldn't find products similar to your images."
+
+            return {
+                'type': 'image_search',
+                'message': response_message,
+                'products': products,
+                'image_descriptions': image_descriptions,
+                'search_queries': search_queries,
+                'total_found': sum(r.get('total_found', 0) for r in all_results),
+                'follow_up_questions': [
+                    "Would you like to compare these products?",
+                    "Are you looking for a specific price range?",
+                    "Do you need help with product details?"
+                ]
+            }
+
+        except Exception as e:
+            return {
+                'type': 'error',
+                'message': "I had trouble analyzing your images. Please try uploading clear product images.",
+                'products': [],
+                'error': str(e)
+            }
+
+    def _build_image_search_query(self, image_description: str) -> str:
+        """Build a semantic search query (audience + product type + category) from an image description."""
+        # Extract key attributes and create a rich, semantic query
+        fields = _parse_description(image_description)
+        product_type = fields.get('product type') or "product"
+        target_audience = _simplify_audience(fields.get('target audience'))
+        category = fields.get('category')
+
+        # Build query: product_type + target_audience + category (if relevant)
+        query_parts = []
+        if target_audience:
+            query_parts.append(target_audience)
+        query_parts.append(product_type)
+        if category and category not in ['miscellaneous', 'general']:
+            query_parts.append(category)
+
+        return ' '.join(query_parts)
+
+    def _describe_image(self, image: Union[str, bytes, Image.Image]) -> str:
+        """Prepare and analyze an image, falling back to a generic description."""
+        try:
+            image_data = self._prepare_image_for_analysis(image)
+            return self._analyze_image_content(image_data)
+        except Exception:
+            return "Product image provided"
+
     def _prepare_image_for_analysis(self, image: Union[str, bytes, Image.Image]) -> bytes:
-        """Prepare image data for Gemini Vision analysis."""
+        """
+        Prepare image data for Gemini Vision analysis.
+
+        Images larger than VISION_MAX_EDGE (or with an EXIF rotation) are
+        re-encoded as a downscaled JPEG; small upright JPEGs pass through as-is.
+        Re-encoded results for raw bytes are cached by content hash, so repeated
+        uploads skip the decode/resize.
+        """
         if isinstance(image, str):
             # File path
             with open(image, 'rb') as f:
-                return f.read()
-        elif isinstance(image, bytes):
-            # Raw bytes
-            return image
+                image = f.read()
+
+        if isinstance(image, bytes):
+            key = blake3.blake3(image).digest()[:16]
+            with self._image_desc_lock:
+                prepared = self._prepared_cache.get(key)
+            if prepared is not None:
+                return prepared
+
+            # Raw bytes (Image.open only reads the header here)
+            img = Image.open(io.BytesIO(image))
+            if (img.format == 'JPEG' and max(img.size) <= VISION_MAX_EDGE
+                    and img.getexif().get(0x0112, 1) == 1):
+                return image
+            # Let the JPEG decoder downscale by a power of two while decoding
+            img.draft('RGB', (VISION_MAX_EDGE, VISION_MAX_EDGE))
+            prepared = self._encode_for_vision(img)
+            with self._image_desc_lock:
+                self._prepared_cache[key] = prepared
+            return prepared
         elif isinstance(image, Image.Image):
-            # PIL Image
-            buffer = io.BytesIO()
-            image.save(buffer, format='JPEG')
-            return buffer.getvalue()
+            return self._encode_for_vision(image)
         else:
             raise ValueError("Unsupported image format")
+
+    def _encode_for_vision(self, image: Image.Image) -> bytes:
+        """Orient, downscale and JPEG-encode a PIL image for Gemini Vision."""
+        # Apply EXIF orientation, clamp size (JPEG has no alpha channel, so normalize mode)
+        image = ImageOps.exif_transpose(image)
+        scale = VISION_MAX_EDGE / max(image.size)
+        if scale < 1:
+            image = image.resize(
+                (max(1, int(image.width * scale)), max(1, int(image.height * scale))),
+                Image.Resampling.LANCZOS
+            )
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        buffer = self._get_buffer()
+        image.save(buffer, format='JPEG', quality=85, optimize=True, progressive=True)
+        return buffer.getvalue()
+    
+    def _get_buffer(self) -> io.BytesIO:
+        """Per-thread scratch buffer for JPEG encoding, emptied for reuse."""
+        buffer = getattr(self._tls, 'buffer', None)
+        if buffer is None:
+            buffer = self._tls.buffer = io.BytesIO()
+        buffer.seek(0)
+        buffer.truncate(0)
+        return buffer
     
+    def _lookup_similar_image(self, image_hash: int) -> Optional[str]:
+        """Description of a cached image within PHASH_MAX_DISTANCE bits of `image_hash`, if any."""
+        with self._image_desc_lock:
+            entries = list(self._image_phash_cache.items())
+        if not entries:
+            return None
+        hashes = np.fromiter((h for h, _ in entries), dtype=np.uint64, count=len(entries))
+        # Hamming distance: XOR, then popcount over the 8 bytes of each hash
+        distances = np.unpackbits((hashes ^ np.uint64(image_hash)).view(np.uint8)).reshape(-1, 64).sum(axis=1)
+        best = int(np.argmin(distances))
+        if distances[best] <= PHASH_MAX_DISTANCE:
+            return entries[best][1]
+        return None
+
     def _analyze_image_content(self, image_data: bytes) -> str:
-        """Analyze image content using Gemini Vision."""
+        """
+        Analyze image content using Gemini Vision (cached by image content hash).
+
+        The description ends at the "Target Audience:" line (Product Type, Category,
+        Target Audience): generation stops once search has what it needs, so this is
+        also all the client gets as `image_description`.
+        """
+        key = blake3.blake3(image_data).digest()[:16]
+        with self._image_desc_lock:
+            cached = self._image_desc_cache.get(key)
+        if cached is not None:
+            logger.debug("Image description cache hit")
+            return cached
+
+        # Near-duplicate uploads (re-compressed, resized, screenshotted) match by perceptual hash
+        try:
+            image_hash = _dhash(image_data)
+            cached = self._lookup_similar_image(image_hash)
+        except Exception as e:
+            logger.debug(f"Perceptual hash failed: {e}")
+            image_hash, cached = None, None
+        if cached is not None:
+            logger.debug("Image description perceptual-hash hit")
+            return cached
+
         try:
             # Ensure vision model is loaded
             self._ensure_vision_model()
@@ -349,159 +909,50 @@ class ConversationalAgent:
             Provide ONLY the following information in a structured format:
             - Product Type: (e.g., shirt, headphones, water bottle, etc.)
             - Category: (e.g., clothing, electronics, home goods, etc.)
+            - Target Audience: (e.g., men, women, kids, unisex, etc.)
             - Main Colors: (list 1-3 dominant colors)
             - Key Features: (list 2-4 distinctive visual features)
             - Material/Build: (if visible, e.g., cotton, plastic, metal, etc.)
             - Brand/Logo: (if visible)
-            - Target Audience: (e.g., men, women, kids, unisex, etc.)
 
             Be specific and concise. Focus on attributes that would help find similar products in an e-commerce catalog.
             """
 
-            response = self.vision_model.generate_content([prompt, image_part])
-            return response.text.strip()
+            # Stream the answer and stop once the fields search uses (product type,
+            # category, target audience - requested first) are complete
+            response = self.vision_model.generate_content([prompt, image_part], stream=True)
+            buffer = []
+            try:
+                for chunk in response:
+                    buffer.append(chunk.text)
+                    if _VISION_DONE_RE.search(''.join(buffer)):
+                        break
+            finally:
+                _close_stream(response)
+            description = ''.join(buffer).strip()
+            with self._image_desc_lock:
+                self._image_desc_cache[key] = description
+                if image_hash is not None:
+                    self._image_phash_cache[image_hash] = description
+            return description
 
         except Exception as e:
             logger.error(f"Error analyzing image with Gemini Vision: {e}")
             return "Product type: general item\nCategory: miscellaneous"
 
-    def _extract_product_type(self, image_description: str) -> Optional[str]:
-        """Extract just the product type from image description for fallback search."""
-        try:
-            # Parse the structured description (handles both "Product Type:" and "- Product Type:")
-            for line in image_description.split('\n'):
-                line_stripped = line.strip().lstrip('-').strip()
-                if line_stripped.lower().startswith('product type:'):
-                    product_type = line_stripped.split(':', 1)[1].strip()
-                    return product_type
-            return None
-        except Exception:
-            return None
-
-    def _extract_category(self, image_description: str) -> Optional[str]:
-        """Extract category from image description."""
-        try:
-            for line in image_description.split('\n'):
-                line_stripped = line.strip().lstrip('-').strip()
-                if line_stripped.lower().startswith('category:'):
-                    category = line_stripped.split(':', 1)[1].strip()
-                    return category
-            return None
-        except Exception:
-            return None
-
-    def _extract_target_audience(self, image_description: str) -> Optional[str]:
-        """Extract target audience from image description."""
-        try:
-            for line in image_description.split('\n'):
-                line_stripped = line.strip().lstrip('-').strip()
-                if line_stripped.lower().startswith('target audience:'):
-                    audience = line_stripped.split(':', 1)[1].strip().lower()
-                    # Simplify audience terms
-                    if 'women' in audience or 'female' in audience:
-                        return "women's"
-                    elif 'men' in audience or 'male' in audience:
-                        return "men's"
-                    elif 'kid' in audience or 'child' in audience:
-                        return "kids"
-            return None
-        except Exception:
-            return None
-
-    def _simplify_image_query(self, image_description: str, baml_query: str) -> str:
-        """
-        Aggressively simplify image search query to maximize catalog matches.
-        Removes colors, brands, and overly specific attributes.
-        """
-        # Extract key info from structured description
-        product_type = None
-        target_audience = None
-        category = None
-
-        for line in image_description.split('\n'):
-            line_lower = line.lower()
-            if line_lower.startswith('product type:'):
-                product_type = line.split(':', 1)[1].strip()
-            elif line_lower.startswith('target audience:'):
-                target_audience = line.split(':', 1)[1].strip().lower()
-            elif line_lower.startswith('category:'):
-                category = line.split(':', 1)[1].strip().lower()
-
-        # Build simplified query: [audience] + [product_type] + [category if relevant]
-        query_parts = []
-
-        # Add target audience if specified and relevant
-        if target_audience and target_audience not in ['unisex', 'adults', 'general']:
-            # Simplify audience terms
-            if 'women' in target_audience or 'female' in target_audience:
-                query_parts.append("women's")
-            elif 'men' in target_audience or 'male' in target_audience:
-                query_parts.append("men's")
-            elif 'kid' in target_audience or 'child' in target_audience:
-                query_parts.append("kids")
-
-        # Add product type (REQUIRED)
-        if product_type:
-            # Remove brand names, colors, materials from product type
-            product_clean = product_type.lower()
-            # Remove common brand indicators
-            for brand_word in ['nike', 'adidas', 'just so', 'apple', 'samsung', 'sony']:
-                product_clean = product_clean.replace(brand_word, '')
-            # Remove color words
-            for color in ['black', 'white', 'red', 'blue', 'pink', 'coral', 'peach', 'gray', 'grey', 'green', 'yellow', 'purple']:
-                product_clean = product_clean.replace(color, '')
-            product_clean = ' '.join(product_clean.split())  # Remove extra spaces
-            query_parts.append(product_clean)
-        else:
-            query_parts.append("product")
-
-        # Add broad category hint if helpful
-        if category and category in ['clothing', 'electronics', 'shoes', 'footwear']:
-            if category == 'footwear':
-                category = 'shoes'
-            if category not in ' '.join(query_parts):
-                query_parts.append(category)
-
-        simplified = ' '.join(query_parts).strip()
-
-        # Final cleanup: limit to 3-4 words max
-        words = simplified.split()
-        if len(words) > 4:
-            simplified = ' '.join(words[:4])
-
-        return simplified if simplified else "product"
-
-    def _generate_conversation_followups(self, message: str) -> List[str]:
-        """Generate follow-up questions for general conversation."""
-        message_lower = message.lower()
-        
-        if any(word in message_lower for word in ['name', 'who', 'what are you']):
-            return [
-                "What products are you shopping for today?",
-                "Would you like to upload an image to find similar products?",
-                "What categories interest you most?"
-            ]
-        elif any(word in message_lower for word in ['help', 'can you', 'what can']):
-            return [
-                "Try asking: 'Find me wireless headphones'",
-                "Upload a product image for visual search",
-                "Ask about specific categories like electronics or clothing"
-            ]
+    def _generate_conversation_followups(self, message: str) -> Sequence[str]:
+        """Generate follow-up questions for general conversation (shared tuples; don't mutate)."""
+        if _IDENTITY_KWS_RE.search(message):
+            return _FOLLOWUPS_IDENTITY
+        elif _HELP_KWS_RE.search(message):
+            return _FOLLOWUPS_HELP
         else:
-            return [
-                "What can I help you find today?",
-                "Would you like product recommendations?",
-                "Need help with a specific category?"
-            ]
+            return _FOLLOWUPS_DEFAULT
     
-    def _generate_product_followups(self, query: str, products: List[Dict]) -> List[str]:
+    def _generate_product_followups(self, query: str, products: List[Dict]) -> Sequence[str]:
         """Generate follow-up questions for product searches."""
         if not products:
-            return [
-                "Try different keywords",
-                "Upload an image of what you're looking for",
-                "Ask about our available categories"
-            ]
+            return _FOLLOWUPS_NO_RESULTS
 
         categories = list(set(p.get('category', '') for p in products[:3]))
 
@@ -513,12 +964,18 @@ class ConversationalAgent:
 
         return followups
 
+    def _categories(self) -> List[str]:
+        """Catalog categories, computed once (the catalog doesn't change at runtime)."""
+        if self._cached_categories is None:
+            if not self.search_engine:
+                return []
+            self._cached_categories = self.search_engine.get_category_suggestions()
+        return self._cached_categories
+
     def _generate_no_results_message(self, original_query: str, refined_query: str) -> str:
         """Generate helpful message when no products are found."""
         # Get available categories to suggest
-        available_categories = []
-        if self.search_engine and hasattr(self.search_engine, 'get_category_suggestions'):
-            available_categories = self.search_engine.get_category_suggestions()[:5]
+        available_categories = self._categories()[:5]
 
         message = f"I couldn't find any products matching '{original_query}'. "
 
@@ -531,10 +988,12 @@ class ConversationalAgent:
         return message
     
     def get_agent_info(self) -> Dict:
-        """Get information about the agent."""
+        """Get information about the agent (built once; the catalog is fixed per process)."""
+        if self._info_cache is not None:
+            return self._info_cache
         # Ensure search engine is loaded before accessing it
         self._ensure_search_engine()
-        return {
+        self._info_cache = {
             'name': self.agent_name,
             'description': self.agent_description,
             'capabilities': [
@@ -543,14 +1002,19 @@ class ConversationalAgent:
                 'Image-based product search',
                 'Product comparison and explanations'
             ],
-            'available_categories': self.search_engine.get_category_suggestions() if self.search_engine else [],
+            'available_categories': self._categories(),
             'total_products': len(self.search_engine.products_data) if self.search_engine else 0
         }
+        return self._info_cache
     
     def explain_product(self, product_id: str, user_query: str) -> str:
         """Get detailed explanation for a product recommendation."""
         return self.search_engine.get_product_explanation(product_id, user_query)
 
+    def explain_products(self, product_ids: List[str], user_query: str) -> List[str]:
+        """Get explanations for several product recommendations in one LLM call."""
+        return self.search_engine.get_product_explanations(product_ids, user_query)
+
 
 # Agent API for external use
 class AgentAPI:
@@ -561,17 +1025,18 @@ class AgentAPI:
     def __init__(self):
         self.agent = ConversationalAgent()
     
-    def chat(self, message: str, image_path: Optional[str] = None, **filters) -> Dict:
+    def chat(self, message: str, image: Optional[Union[bytes, Image.Image, List]] = None, **filters) -> Dict:
         """
         Chat with the agent.
         
         Args:
             message: User message
-            image_path: Optional path to image file
+            image: Optional in-memory image (PIL Image or raw bytes), or a list of images
             **filters: Optional search filters (category, min_price, max_price, min_rating)
             
         Returns:
-            Agent response dictionary
+            Agent response dictionary (plain dicts/lists/tuples/str/numbers, so it
+            can be serialized directly with orjson.dumps)
         """
         # Convert filters
         search_filters = {}
@@ -584,20 +1049,41 @@ class AgentAPI:
         if 'min_rating' in filters:
             search_filters['min_rating'] = float(filters['min_rating'])
         
-        # Load image if provided
-        image = None
-        if image_path and os.path.exists(image_path):
-            image = image_path
-        
         # Optional price_bucket passthrough (int or list)
         if 'price_bucket' in filters:
             search_filters['price_bucket'] = filters['price_bucket']
         return self.agent.process_message(message, image, search_filters)
     
+    def load_models(self):
+        """Eagerly load the search engine (embedding model, product catalog, Pinecone client)."""
+        self.agent._ensure_search_engine()
+
+    def warm_up(self):
+        """
+        Load models and exercise first-call code paths so the first user request
+        doesn't pay for them. Safe before fork: the Pinecone client (connection pool
+        and threads) is not created here but on the first search in each worker.
+        """
+        self.load_models()
+        self.agent._ensure_vision_model()
+        try:
+            # Tokenizer + forward pass of the embedding model
+            self.agent.search_engine.embed_query("warmup")
+            # JPEG codec (encode + decode)
+            buffer = io.BytesIO()
+            Image.new('RGB', (8, 8)).save(buffer, format='JPEG')
+            Image.open(io.BytesIO(buffer.getvalue())).load()
+        except Exception as e:
+            logger.warning(f"Agent warm-up failed: {e}")
+
     def get_info(self) -> Dict:
         """Get agent information."""
         return self.agent.get_agent_info()
     
     def explain_product(self, product_id: str, query: str) -> str:
         """Get product explanation."""
-        return self.agent.explain_product(product_id, query)
\ No newline at end of file
+        return self.agent.explain_product(product_id, query)
+
+    def explain_products(self, product_ids: List[str], query: str) -> List[str]:
+        """Get explanations for several products."""
+        return self.agent.explain_products(product_ids, query)
\ No newline at end of file
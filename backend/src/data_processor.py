@@ -1,10 +1,30 @@
-import json
+import orjson
+import numpy as np
 import pandas as pd
 from datasets import load_dataset
+from dataclasses import dataclass
 from typing import List, Dict, Optional
 import os
 from datetime import datetime
 
+@dataclass(slots=True, frozen=True)
+class Product:
+    """
+    Processed product record (compact, immutable; orjson serializes it natively).
+    """
+    id: str
+    title: str
+    description: str
+    category: str
+    store: Optional[str]
+    price: Optional[float]
+    rating: Optional[float]
+    rating_count: int
+    image_url: Optional[str]
+    filename: str
+    date_available: Optional[str]
+
+
 class AmazonDataProcessor:
     """
     Process Amazon Products 2023 dataset intelligently.
@@ -23,39 +43,61 @@ class AmazonDataProcessor:
         'meta_Pet_Supplies'
     ]
     
-    def __init__(self, target_size: int = 250):
+    def __init__(self, target_size: int = 250, max_candidates: int = 20000):
         """
         Initialize processor with target dataset size.
 
         Args:
             target_size: Target number of products (250 recommended for quality)
+            max_candidates: Cap on streamed candidates kept in memory (split evenly across categories)
         """
         self.target_size = target_size
+        self.max_candidates = max_candidates
         self.processed_data = []
         
-    def load_and_filter_data(self) -> List[Dict]:
+    def load_and_filter_data(self) -> List[Product]:
         """
         Load dataset and intelligently filter to target size.
         
         Returns:
-            List of processed product dictionaries
+            List of processed product records
         """
         print("Loading Amazon Products 2023 dataset...")
         
         try:
-            # Load the dataset
-            ds = load_dataset("milistu/AMAZON-Products-2023")
-            df = ds['train'].to_pandas()
+            # Stream the dataset and keep only priority-category rows that can pass the
+            # quality filters, so the full dataset is never materialized in memory
+            priority_set = frozenset(self.PRIORITY_CATEGORIES)
+            ds = load_dataset("milistu/AMAZON-Products-2023", split='train', streaming=True)
+            candidates = ds.filter(
+                lambda r: r['filename'] in priority_set
+                and (r.get('rating_number') or 0) >= 50
+                and (r.get('average_rating') or 0) >= 3.5
+            )
+            # Keep at most an equal share of max_candidates per category, stopping the
+            # stream once every category is full
+            per_category = max(1, self.max_candidates // len(self.PRIORITY_CATEGORIES))
+            counts = dict.fromkeys(priority_set, 0)
+            rows = []
+            for row in candidates:
+                if counts[row['filename']] < per_category:
+                    counts[row['filename']] += 1
+                    rows.append(row)
+                    if len(rows) == per_category * len(counts):
+                        break
+            if not rows:
+                raise ValueError(
+                    "No products in the priority categories passed the rating filters "
+                    "(rating_number >= 50, average_rating >= 3.5)"
+                )
+            priority_products = pd.DataFrame(rows)
             
-            print(f"Original dataset size: {len(df)} products")
-            
-            # Filter by priority categories
-            priority_products = df[df['filename'].isin(self.PRIORITY_CATEGORIES)]
-            
-            print(f"Priority categories contain: {len(priority_products)} products")
+            print(f"Priority categories contain: {len(priority_products)} candidate products")
             
             # Further filtering for quality and completeness
             filtered_df = self._apply_quality_filters(priority_products)
+            if filtered_df.empty:
+                raise ValueError("No candidate products passed the quality filters")
             
             # Sample to target size if needed
             if len(filtered_df) > self.target_size:
@@ -85,35 +127,41 @@ class AmazonDataProcessor:
         Returns:
             Filtered DataFrame
         """
-        # Filter criteria for quality products
-        filtered = df[
+        # Filter criteria for quality products, fused into one boolean mask.
+        # Lengths and ratings are extracted once as float arrays; NaN compares
+        # False, so the comparisons also enforce "not missing".
+        title_len = df['title'].str.len().to_numpy(dtype='float64', na_value=np.nan)
+        desc_len = df['description'].str.len().to_numpy(dtype='float64', na_value=np.nan)
+        rating_number = df['rating_number'].to_numpy(dtype='float64', na_value=np.nan)
+        average_rating = df['average_rating'].to_numpy(dtype='float64', na_value=np.nan)
+
+        mask = np.logical_and.reduce([
             # Must have title and description
-            (df['title'].notna()) &
-            (df['description'].notna()) &
-            (df['title'].str.len() > 10) &
-            (df['description'].str.len() > 20) &
+            title_len > 10,
+            desc_len > 20,
 
             # Must have significant rating data (indicates popular, real products)
-            (df['rating_number'].notna()) &
-            (df['rating_number'] >= 50) &
-            (df['average_rating'].notna()) &
+            rating_number >= 50,
+
+            # Filter out products with low ratings
+            average_rating >= 3.5,
 
             # Must have main category
-            (df['main_category'].notna()) &
+            df['main_category'].notna().to_numpy(),
 
             # Must have image
-            (df['image'].notna()) &
-
-            # Filter out products with low ratings
-            (df['average_rating'] >= 3.5)
-        ].copy()
+            df['image'].notna().to_numpy()
+        ])
+        filtered = df.iloc[np.flatnonzero(mask)]
 
         # Remove duplicates (keep highest rated product for duplicate titles)
         filtered = filtered.sort_values('average_rating', ascending=False)
         filtered = filtered.drop_duplicates(subset=['title'], keep='first')
 
         # Sort by rating quality (number of ratings * average rating)
-        filtered['quality_score'] = filtered['rating_number'] * filtered['average_rating']
+        filtered = filtered.assign(
+            quality_score=filtered['rating_number'].to_numpy() * filtered['average_rating'].to_numpy()
+        )
         filtered = filtered.sort_values('quality_score', ascending=False)
 
         return filtered
@@ -128,35 +176,32 @@ class AmazonDataProcessor:
         Returns:
             Sampled DataFrame
         """
-        # Calculate samples per category
+        # Calculate samples per category (vectorized over the category counts)
         category_counts = df['filename'].value_counts()
-        samples_per_category = {}
+        counts = category_counts.to_numpy()
         
-        total_categories = len(category_counts)
-        base_samples = self.target_size // total_categories
-        remaining_samples = self.target_size % total_categories
-        
-        for category in category_counts.index:
-            available = category_counts[category]
-            target = min(base_samples, available)
-            samples_per_category[category] = target
+        base_samples, remaining_samples = divmod(self.target_size, len(counts))
+        samples = np.minimum(counts, base_samples)
         
         # Distribute remaining samples to categories with more products
-        sorted_categories = category_counts.head(remaining_samples).index
-        for category in sorted_categories:
-            if samples_per_category[category] < category_counts[category]:
-                samples_per_category[category] += 1
+        samples[:remaining_samples] += samples[:remaining_samples] < counts[:remaining_samples]
+        samples_per_category = dict(zip(category_counts.index, samples))
+        
+        # Sample from each category in one pass: keep the first n rows of each group
+        rank_in_category = df.groupby('filename').cumcount().to_numpy()
+        limit = df['filename'].map(samples_per_category).to_numpy()
+        sampled = df[rank_in_category < limit]
+        
+        # Keep the original layout: categories in descending-count order
+        category_order = sampled['filename'].map({c: i for i, c in enumerate(category_counts.index)})
+        sampled = sampled.iloc[np.argsort(category_order.to_numpy(), kind='stable')]
         
-        # Sample from each category
-        sampled_dfs = []
         for category, sample_size in samples_per_category.items():
-            category_df = df[df['filename'] == category].head(sample_size)
-            sampled_dfs.append(category_df)
-            print(f"Sampled {len(category_df)} products from {category}")
+            print(f"Sampled {sample_size} products from {category}")
         
-        return pd.concat(sampled_dfs, ignore_index=True)
+        return sampled.reset_index(drop=True)
     
-    def _process_products(self, df: pd.DataFrame) -> List[Dict]:
+    def _process_products(self, df: pd.DataFrame) -> List[Product]:
         """
         Process raw product data into clean format.
         
@@ -164,31 +209,37 @@ class AmazonDataProcessor:
             df: DataFrame to process
             
         Returns:
-            List of processed product dictionaries
+            List of processed product records
         """
         processed = []
         
-        for _, row in df.iterrows():
+        # Pull each column out once as a plain list and zip them, instead of
+        # materializing a Series per row with iterrows()
+        columns = ['parent_asin', 'title', 'description', 'main_category', 'store', 'price',
+                   'average_rating', 'rating_number', 'image', 'filename', 'date_first_available']
+        for row in zip(*(df[col].tolist() for col in columns)):
+            (asin, title, description, main_category, store, price,
+             average_rating, rating_number, image, filename, date_first_available) = row
             try:
                 # Extract and clean data
-                product = {
-                    'id': row['parent_asin'],
-                    'title': str(row['title']).strip(),
-                    'description': str(row['description']).strip(),
-                    'category': str(row['main_category']) if pd.notna(row['main_category']) else 'Unknown',
-                    'store': str(row['store']) if pd.notna(row['store']) else None,
-                    'price': float(row['price']) if pd.notna(row['price']) else None,
-                    'rating': float(row['average_rating']) if pd.notna(row['average_rating']) else None,
-                    'rating_count': int(row['rating_number']) if pd.notna(row['rating_number']) else 0,
-                    'image_url': str(row['image']) if pd.notna(row['image']) else None,
-                    'filename': row['filename'],
-                    'date_available': str(row['date_first_available']) if pd.notna(row['date_first_available']) else None
-                }
+                product = Product(
+                    id=asin,
+                    title=str(title).strip(),
+                    description=str(description).strip(),
+                    category=str(main_category) if pd.notna(main_category) else 'Unknown',
+                    store=str(store) if pd.notna(store) else None,
+                    price=float(price) if pd.notna(price) else None,
+                    rating=float(average_rating) if pd.notna(average_rating) else None,
+                    rating_count=int(rating_number) if pd.notna(rating_number) else 0,
+                    image_url=str(image) if pd.notna(image) else None,
+                    filename=filename,
+                    date_available=str(date_first_available) if pd.notna(date_first_available) else None
+                )
 
                 processed.append(product)
                 
             except Exception as e:
-                print(f"Error processing product {row.get('parent_asin', 'unknown')}: {e}")
+                print(f"Error processing product {asin or 'unknown'}: {e}")
                 continue
         
         return processed
@@ -211,7 +262,7 @@ class AmazonDataProcessor:
             data_with_metadata = {
                 'metadata': {
                     'total_products': len(self.processed_data),
-                    'categories': list(set(p['category'] for p in self.processed_data)),
+                    'categories': list(set(p.category for p in self.processed_data)),
                     'processed_at': datetime.now().isoformat(),
                     'source': 'Amazon Products 2023',
                     'filtering_criteria': 'Priority e-commerce categories with quality filters'
@@ -219,8 +270,9 @@ class AmazonDataProcessor:
                 'products': self.processed_data
             }
             
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(data_with_metadata, f, indent=2, ensure_ascii=False)
+            # orjson writes UTF-8 directly (same as ensure_ascii=False) and keeps the indented layout
+            with open(filepath, 'wb') as f:
+                f.write(orjson.dumps(data_with_metadata, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY))
             
             print(f"Processed data saved to {filepath}")
             return True
@@ -241,7 +293,7 @@ class AmazonDataProcessor:
         
         distribution = {}
         for product in self.processed_data:
-            category = product['category']
+            category = product.category
             distribution[category] = distribution.get(category, 0) + 1
         
         return distribution
@@ -0,0 +1,93 @@
+"""
+Embedding Micro-Batcher
+
+Coalesces concurrent single-query embedding calls into one forward pass:
+    1. Callers enqueue (text, future) and block on the future
+    2. A worker thread takes the first waiting query, then drains more for up
+       to `window` seconds (or until `max_batch` is reached)
+    3. The batch is encoded in one call and each future gets its vector
+
+Only useful when the embedding model runs in-process and requests overlap.
+"""
+
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, List
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingBatcher:
+    """
+    Micro-batcher in front of a batch encode function.
+    """
+
+    def __init__(self,
+                 encode_fn: Callable[[List[str]], np.ndarray],
+                 max_batch: int = 32,
+                 window: float = 0.005):
+        """
+        Initialize embedding batcher.
+
+        Args:
+            encode_fn: Function mapping a list of texts to an array of embeddings
+            max_batch: Maximum number of queries per forward pass
+            window: Seconds to wait for more queries after the first one arrives
+        """
+        self.encode_fn = encode_fn
+        self.max_batch = max_batch
+        self.window = window
+        self._queue = queue.Queue()
+        self._worker = None
+        self._worker_lock = threading.Lock()
+
+    def embed(self, text: str) -> np.ndarray:
+        """
+        Embed a single text, batched with any concurrent callers.
+
+        Args:
+            text: Text to embed
+
+        Returns:
+            Embedding vector
+        """
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((text, future))
+        return future.result()
+
+    def _ensure_worker(self):
+        """Start the worker on first use (after fork, so each process gets its own)."""
+        if self._worker is None or not self._worker.is_alive():
+            with self._worker_lock:
+                if self._worker is None or not self._worker.is_alive():
+                    self._worker = threading.Thread(target=self._run, daemon=True)
+                    self._worker.start()
+
+    def _run(self):
+        """Collect and encode batches forever."""
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            try:
+                embeddings = self.encode_fn([text for text, _ in batch])
+                for (_, future), embedding in zip(batch, embeddings):
+                    future.set_result(embedding)
+                logger.debug("Embedded batch of %d queries", len(batch))
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
@@ -6,15 +6,29 @@ intelligent product search functionality. Uses Pinecone for vector search and
 BAML for LLM-based query refinement and product explanations.
 """
 
-import json
+import ijson
+import orjson
 import os
+import re
+import sys
 import logging
+import threading
 from typing import List, Dict, Optional
+import numpy as np
+from cachetools import LRUCache, TTLCache
 from src.vector_store import VectorStore
 from baml_client import b
 
 logger = logging.getLogger(__name__)
 
+# Resolved against the backend directory so it doesn't depend on CWD
+DEFAULT_EXPLANATION_CACHE_FILE = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'explanations.json'
+)
+
+# "[i] ..." position marker that ties a batched explanation to its product
+_EXPLANATION_MARKER_RE = re.compile(r'^\s*\[(\d+)\]\s*')
+
 class SearchEngine:
     """
     Main search engine that combines vector search with AI-powered recommendations.
@@ -28,18 +42,46 @@ class SearchEngine:
             products_data_file: Path to processed products JSON file
         """
         self.products_data = {}
+        self._explain_payloads: Dict[str, str] = {}
+        self._sorted_categories: List[str] = []
+        self._explanation_cache_file = os.getenv('EXPLANATION_CACHE_FILE', DEFAULT_EXPLANATION_CACHE_FILE)
+        self._explanation_cache: Dict[str, str] = self._load_explanation_cache()
+        self._explanation_lru = LRUCache(maxsize=4096)  # live-generated explanations
+        self._explanation_lru_lock = threading.Lock()  # LRU reads reorder; shared with the agent's I/O threads
+        self._search_cache = TTLCache(maxsize=1024, ttl=60)  # repeat queries skip Pinecone
+        self._search_cache_lock = threading.Lock()
         self.vector_store = VectorStore()
         self._load_products_data(products_data_file)
     
+    def embed_query(self, query: str) -> np.ndarray:
+        """
+        Embed a query with the vector store's model, so other components
+        (e.g. the response cache) share one model instance instead of loading their own.
+        """
+        return self.vector_store.embed_query(query)
+    
     def _load_products_data(self, data_file: str):
         """Load full product data for detailed information."""
         try:
-            with open(data_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                
-            # Create lookup dictionary by product ID
-            for product in data['products']:
-                self.products_data[product['id']] = product
+            # Single streaming pass: lookup dict, categories and explanation
+            # payloads are all built per product (no transient parsed document)
+            categories = set()
+            with open(data_file, 'rb') as f:
+                for product in ijson.items(f, 'products.item', use_float=True):
+                    pid = product['id']
+                    # Few distinct values across the catalog: share one string object each
+                    category = product.get('category')
+                    if category:
+                        category = product['category'] = sys.intern(category)
+                    if product.get('store'):
+                        product['store'] = sys.intern(product['store'])
+                    self.products_data[pid] = product
+                    self._explain_payloads[pid] = orjson.dumps(self._explanation_fields(product)).decode()
+                    if category:
+                        categories.add(category)
+
+            # Catalog is immutable after load, so derived views are computed once
+            self._sorted_categories = sorted(categories)
 
             logger.info(f"Loaded detailed data for {len(self.products_data)} products")
 
@@ -63,12 +105,23 @@ class SearchEngine:
             min_similarity: Minimum similarity threshold (default 0.25, lower for image search)
 
         Returns:
-            Dictionary with search results and metadata
+            Dictionary with search results and metadata (cached for 60s; don't mutate)
         """
+        cache_key = (
+            query,
+            orjson.dumps(filters, option=orjson.OPT_SORT_KEYS) if filters else b'',
+            top_k,
+            round(min_similarity, 3),
+        )
+        with self._search_cache_lock:
+            cached = self._search_cache.get(cache_key)
+        if cached is not None:
+            logger.debug("Search cache hit: '%s'", query)
+            return cached
+
         try:
             # Use refined query passed from entrypoint (already refined upstream)
-            logger.info(f"Search query: '{query}'")
-            refined_query = query
+            logger.info("Search query: '%s'", query)
 
             # Build filters (support price_bucket if provided)
             pinecone_filters = filters or {}
@@ -76,71 +129,196 @@ class SearchEngine:
             # Perform vector similarity search
             logger.debug("Performing vector similarity search...")
             similar_products = self.vector_store.search_similar_products(
-                refined_query,
+                query,
                 top_k=top_k * 5,  # Get more candidates for better recall
                 filters=pinecone_filters,
                 min_similarity=min_similarity
             )
-            logger.info(f"Vector search found {len(similar_products)} products (min_similarity={min_similarity})")
-            
-            if not similar_products:
-                return {
-                    'query': query,
-                    'refined_query': refined_query,
-                    'results': [],
-                    'total_found': 0,
-                    'message': 'No products found matching your search criteria.'
-                }
-            
-            # Step 3: Enrich with full product data
-            enriched_results = []
-            for product_meta, similarity_score in similar_products:
-                product_id = product_meta.get('product_id')
-
-                if product_id and product_id in self.products_data:
-                    full_product = self.products_data[product_id].copy()
-                    full_product['similarity_score'] = similarity_score
-                    # ensure image_url is present
-                    if 'image_url' not in full_product and product_meta.get('image_url'):
-                        full_product['image_url'] = product_meta.get('image_url')
-                    enriched_results.append(full_product)
-                else:
-                    # Fallback: use metadata from vector store
-                    fallback_product = {
-                        'id': product_id or f"unknown_{len(enriched_results)}",
-                        'title': product_meta['title'],
-                        'category': product_meta['category'],
-                        'store': product_meta.get('store'),
-                        'price': product_meta['price'] if product_meta['price'] > 0 else None,
-                        'rating': product_meta['rating'] if product_meta['rating'] > 0 else None,
-                        'rating_count': product_meta['rating_count'],
-                        'image_url': product_meta.get('image_url'),
-                        'similarity_score': similarity_score,
-                        'description': f"Product from {product_meta['category']} category"
-                    }
-                    enriched_results.append(fallback_product)
-            
-            # Return top K results
-            final_results = enriched_results[:top_k]
-            
-            return {
-                'query': query,
-                'refined_query': refined_query,
-                'results': final_results,
-                'total_found': len(similar_products),
-                'message': f'Found {len(final_results)} relevant products'
-            }
-            
+            logger.info("Vector search found %d products (min_similarity=%s)", len(similar_products), min_similarity)
+
+            result = self._build_results(query, similar_products, top_k)
+            # Only successful, non-empty searches are cached (failures raise and are never stored)
+            if result['results']:
+                with self._search_cache_lock:
+                    self._search_cache[cache_key] = result
+            return result
+
         except Exception as e:
-            logger.error(f"Search error: {e}", exc_info=True)
+            logger.error("Search error: %s", e, exc_info=True)
+            return self._error_result(query, e)
+
+    def search_batch(self,
+                     queries: List[str],
+                     filters: Optional[Dict] = None,
+                     top_k: int = 10,
+                     min_similarity: float = 0.25) -> List[Dict]:
+        """
+        Run several searches at once (queries are embedded in a single batch).
+
+        Args:
+            queries: User search queries
+            filters: Optional search filters (shared by all queries)
+            top_k: Number of results to return per query
+            min_similarity: Minimum similarity threshold
+
+        Returns:
+            One search result dictionary per query, in order
+        """
+        try:
+            logger.info("Batch search queries: %s", queries)
+            similar_per_query = self.vector_store.search_similar_products_batch(
+                queries,
+                top_k=top_k * 5,
+                filters=filters or {},
+                min_similarity=min_similarity
+            )
+            return [
+                self._build_results(query, similar_products, top_k)
+                for query, similar_products in zip(queries, similar_per_query)
+            ]
+
+        except Exception as e:
+            logger.error("Search error: %s", e, exc_info=True)
+            return [self._error_result(query, e) for query in queries]
+
+    def _build_results(self, query: str, similar_products: List, top_k: int) -> Dict:
+        """Enrich vector search matches with full product data and build the result dict."""
+        refined_query = query
+
+        if not similar_products:
             return {
                 'query': query,
+                'refined_query': refined_query,
                 'results': [],
                 'total_found': 0,
-                'error': str(e),
-                'message': 'Search encountered an error. Please try again.'
+                'message': 'No products found matching your search criteria.'
             }
+
+        # Step 3: Enrich with full product data
+        enriched_results = []
+        get_product = self.products_data.get
+        for product_meta, similarity_score in similar_products:
+            product_id = product_meta.get('product_id')
+            product = get_product(product_id) if product_id else None
+
+            if product is not None:
+                full_product = {**product, 'similarity_score': similarity_score}
+                # ensure image_url is present
+                if 'image_url' not in full_product and product_meta.get('image_url'):
+                    full_product['image_url'] = product_meta['image_url']
+                enriched_results.append(full_product)
+            else:
+                # Fallback: use metadata from vector store
+                fallback_product = {
+                    'id': product_id or f"unknown_{len(enriched_results)}",
+                    'title': product_meta['title'],
+                    'category': product_meta['category'],
+                    'store': product_meta.get('store'),
+                    'price': product_meta['price'] if product_meta['price'] > 0 else None,
+                    'rating': product_meta['rating'] if product_meta['rating'] > 0 else None,
+                    'rating_count': product_meta['rating_count'],
+                    'image_url': product_meta.get('image_url'),
+                    'similarity_score': similarity_score,
+                    'description': f"Product from {product_meta['category']} category"
+                }
+                enriched_results.append(fallback_product)
+
+            # Candidates are sorted by score; only the top K are returned
+            if len(enriched_results) >= top_k:
+                break
+
+        # Return top K results
+        final_results = enriched_results[:top_k]
+
+        return {
+            'query': query,
+            'refined_query': refined_query,
+            'results': final_results,
+            'total_found': len(similar_products),
+            'message': f'Found {len(final_results)} relevant products'
+        }
+
+    @staticmethod
+    def _error_result(query: str, error: Exception) -> Dict:
+        """Result dictionary returned when a search fails."""
+        return {
+            'query': query,
+            'results': [],
+            'total_found': 0,
+            'error': str(error),
+            'message': 'Search encountered an error. Please try again.'
+        }
     
+    def _load_explanation_cache(self) -> Dict[str, str]:
+        """Load precomputed explanations written by `backfill_explanations`, if any."""
+        try:
+            with open(self._explanation_cache_file, 'rb') as f:
+                cache = orjson.loads(f.read())
+            logger.info(f"Loaded {len(cache)} precomputed explanations")
+            return cache
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logger.error(f"Error loading explanation cache: {e}")
+            return {}
+
+    @staticmethod
+    def _explanation_key(product_id: str, user_query: str) -> str:
+        """Key for the precomputed explanation cache (query is case- and whitespace-insensitive)."""
+        return f"{product_id}\x00{' '.join(user_query.split()).lower()}"
+
+    def backfill_explanations(self, product_ids: List[str], user_query: str, batch_size: int = 20) -> int:
+        """
+        Precompute explanations offline (e.g. for trending products) and persist them,
+        so live `get_product_explanation` calls are served without an LLM round-trip.
+        Products are sent in chunks of `batch_size` per ExplainRecommendationsBatch call.
+        
+        Args:
+            product_ids: IDs of the products to explain
+            user_query: Query the explanations are for
+            batch_size: Products per LLM call
+            
+        Returns:
+            Number of explanations added to the cache
+        """
+        pending = [pid for pid in product_ids
+                   if pid in self.products_data
+                   and self._explanation_key(pid, user_query) not in self._explanation_cache]
+        added = 0
+        for start in range(0, len(pending), batch_size):
+            chunk = pending[start:start + batch_size]
+            explanations = self._generate_explanations(chunk, user_query)
+            for pid, explanation in zip(chunk, explanations):
+                if explanation is not None:
+                    self._explanation_cache[self._explanation_key(pid, user_query)] = explanation
+                    added += 1
+
+        if added:
+            # Write to a temp file and swap it in, so a crash never leaves a truncated cache
+            tmp_file = f"{self._explanation_cache_file}.{os.getpid()}.tmp"
+            with open(tmp_file, 'wb') as f:
+                f.write(orjson.dumps(self._explanation_cache))
+            os.replace(tmp_file, self._explanation_cache_file)
+            logger.info(f"Backfilled {added} explanations into {self._explanation_cache_file}")
+        return added
+
+    @staticmethod
+    def _explanation_fields(product: Dict) -> Dict:
+        """Product fields passed to the explanation prompts (serialized once at load into `_explain_payloads`)."""
+        return {
+            'id': product.get('id'),
+            'title': product.get('title'),
+            'description': product.get('description', ''),
+            'category': product.get('category'),
+            'subcategories': product.get('subcategories', []),
+            'price': product.get('price'),
+            'rating': product.get('rating'),
+            'rating_count': product.get('rating_count'),
+            'store': product.get('store'),
+            'image_url': product.get('image_url'),
+            'features': product.get('features', [])[:5]
+        }
+
     def get_product_explanation(self, product_id: str, user_query: str) -> str:
         """
         Get AI explanation for why a product is recommended.
@@ -152,41 +330,130 @@ class SearchEngine:
         Returns:
             AI-generated explanation
         """
-        try:
-            if product_id not in self.products_data:
-                return "Product information not available."
-            
-            product = self.products_data[product_id]
-            product_info = json.dumps({
-                'id': product.get('id'),
-                'title': product.get('title'),
-                'description': product.get('description', ''),
-                'category': product.get('category'),
-                'subcategories': product.get('subcategories', []),
-                'price': product.get('price'),
-                'rating': product.get('rating'),
-                'rating_count': product.get('rating_count'),
-                'store': product.get('store'),
-                'image_url': product.get('image_url'),
-                'features': product.get('features', [])[:5]
-            }, indent=2)
+        return self.get_product_explanations([product_id], user_query)[0]
+
+    def get_product_explanations(self, product_ids: List[str], user_query: str) -> List[str]:
+        """
+        Get AI explanations for several recommended products in one LLM call.
+
+        Precomputed (see `backfill_explanations`) and recently generated explanations
+        are served from cache;
+        a single missing product uses the dedicated single-product prompt.
+        
+        Args:
+            product_ids: IDs of the products
+            user_query: Original user query
             
-            explanation = b.ExplainRecommendation(product_info, user_query)
-            return explanation
+        Returns:
+            One explanation per product ID, in the same order
+        """
+        explanations = []
+        missing = []
+        for pid in product_ids:
+            if pid not in self.products_data:
+                explanations.append("Product information not available.")
+                continue
+            key = self._explanation_key(pid, user_query)
+            cached = self._explanation_cache.get(key)
+            if cached is None:
+                with self._explanation_lru_lock:
+                    cached = self._explanation_lru.get(key)
+            if cached is None:
+                missing.append(len(explanations))
+            explanations.append(cached)
+
+        if missing:
+            generated = self._generate_explanations([product_ids[i] for i in missing], user_query)
+            with self._explanation_lru_lock:
+                for i, explanation in zip(missing, generated):
+                    if explanation:
+                        self._explanation_lru[self._explanation_key(product_ids[i], user_query)] = explanation
+            for i, explanation in zip(missing, generated):
+                explanations[i] = explanation or "Unable to generate explanation for this product."
+        return explanations
+
+    def clear_explanation_cache(self):
+        """Drop in-memory explanations (precomputed ones on disk are kept)."""
+        with self._explanation_lru_lock:
+            self._explanation_lru.clear()
+
+    def _generate_explanations(self, product_ids: List[str], user_query: str) -> List[Optional[str]]:
+        """
+        Run the explanation LLM call for known product IDs.
+
+        Batched explanations are matched to products by their "[i]" marker, never by
+        list position; products whose explanation is missing or ambiguous are retried
+        one at a time with ExplainRecommendation.
+
+        Returns:
+            One explanation per product ID, None where generation failed
+        """
+        explanations: List[Optional[str]] = [None] * len(product_ids)
+        try:
+            if len(product_ids) > 1:
+                products_block = "\n".join(
+                    f"[{i}] {self._explain_payloads[pid]}"
+                    for i, pid in enumerate(product_ids)
+                )
+                seen = set()
+                for text in b.ExplainRecommendationsBatch(products_block, user_query):
+                    match = _EXPLANATION_MARKER_RE.match(text)
+                    i = int(match.group(1)) if match else -1
+                    if 0 <= i < len(product_ids):
+                        # Two explanations for one product: trust neither
+                        explanations[i] = None if i in seen else text[match.end():].strip() or None
+                        seen.add(i)
+
+                missing = [i for i, e in enumerate(explanations) if e is None]
+                if missing:
+                    logger.warning("Batched explanations unmatched for %d of %d products; retrying individually",
+                                   len(missing), len(product_ids))
+            else:
+                missing = [0]
+
+            for i in missing:
+                explanations[i] = b.ExplainRecommendation(self._explain_payloads[product_ids[i]], user_query)
+            return explanations
             
         except Exception as e:
-            logger.error(f"Error generating explanation: {e}")
-            return "Unable to generate explanation for this product."
+            logger.error("Error generating explanation: %s", e)
+            return explanations
     
     def get_category_suggestions(self) -> List[str]:
         """
         Get list of available product categories.
         
         Returns:
-            List of category names
+            Sorted list of category names (computed at load; don't mutate)
         """
-        categories = set()
-        for product in self.products_data.values():
-            if product['category']:
-                categories.add(product['category'])
-        return sorted(list(categories))
\ No newline at end of file
+        return self._sorted_categories
+
+
+def main():
+    """
+    Offline explanation backfill, e.g. for trending products (run from backend/):
+
+        python -m src.search_engine --query "wireless headphones" --top 20
+        python -m src.search_engine --query "gift for dad" --ids B01 B02 B03
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Precompute product explanations into the explanation cache")
+    parser.add_argument('--query', required=True, help="User query the explanations are for")
+    parser.add_argument('--ids', nargs='+', help="Product IDs to explain")
+    parser.add_argument('--top', type=int, default=10, help="Without --ids: explain the top N search results")
+    parser.add_argument('--batch-size', type=int, default=20, help="Products per LLM call")
+    parser.add_argument('--data', default=os.path.join(os.path.dirname(DEFAULT_EXPLANATION_CACHE_FILE),
+                                                       'processed_products.json'),
+                        help="Processed products JSON file")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    engine = SearchEngine(args.data)
+    product_ids = args.ids or [p['id'] for p in engine.search(args.query, top_k=args.top)['results']]
+    added = engine.backfill_explanations(product_ids, args.query, batch_size=args.batch_size)
+    print(f"Backfilled {added} explanations ({len(product_ids)} products) into {engine._explanation_cache_file}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""
+Semantic Response Cache
+
+In-process cache that short-circuits repeat and near-repeat queries:
+    1. Exact-match fast path keyed by a hash of the normalized query text
+    2. Similarity path: cosine similarity of the query embedding against the
+       cached embeddings of its namespace (one numpy matmul), hit when score >= threshold
+
+Entries can be partitioned by a namespace (e.g. image hash + filters); the
+similarity path only compares queries within the same namespace. Each namespace
+keeps a preallocated matrix of L2-normalized embeddings, so a lookup is a single
+matrix-vector product with no per-call stacking or norm computation.
+
+Entries expire after a TTL so catalog or prompt changes are eventually picked up.
+The cache is shared by request threads and the agent's I/O pool, so all access
+goes through one lock.
+"""
+
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import blake3
+import numpy as np
+from cachetools import TTLCache
+
+logger = logging.getLogger(__name__)
+
+
+class _NamespaceIndex:
+    """
+    Rows of normalized embeddings for one namespace, with the entry key of each row.
+    Rows of expired/evicted entries are dropped lazily when the matrix fills up.
+    """
+
+    def __init__(self, dim: int, capacity: int = 8):
+        self.matrix = np.empty((capacity, dim), dtype=np.float32)
+        self.keys: List[bytes] = []
+
+    def add(self, key: bytes, embedding: np.ndarray, live: Callable[[bytes], bool]):
+        """Append a row, compacting away dead rows (and growing) when the matrix is full."""
+        if len(self.keys) == len(self.matrix):
+            alive = [i for i, k in enumerate(self.keys) if live(k) and k != key]
+            capacity = len(self.matrix)
+            if len(alive) + 1 > capacity // 2:
+                capacity *= 2
+            matrix = np.empty((capacity, self.matrix.shape[1]), dtype=np.float32)
+            matrix[:len(alive)] = self.matrix[alive]
+            self.matrix = matrix
+            self.keys = [self.keys[i] for i in alive]
+        self.matrix[len(self.keys)] = embedding
+        self.keys.append(key)
+
+
+class SemanticCache:
+    """
+    Similarity cache mapping query embeddings to previously computed responses.
+    """
+
+    def __init__(self,
+                 embed_fn: Callable[[str], np.ndarray],
+                 threshold: float = 0.97,
+                 maxsize: int = 1024,
+                 ttl: int = 6 * 3600):
+        """
+        Initialize semantic cache.
+
+        Args:
+            embed_fn: Function mapping a text to its embedding vector
+            threshold: Minimum cosine similarity for a semantic hit (0-1)
+            maxsize: Maximum number of cached entries
+            ttl: Entry lifetime in seconds
+        """
+        self.embed_fn = embed_fn
+        self.threshold = threshold
+        self._entries = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._namespaces: Dict[str, _NamespaceIndex] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(text: str, namespace: str = '') -> bytes:
+        """Exact-match key for a query (case- and whitespace-insensitive, 128-bit BLAKE3)."""
+        normalized = ' '.join(text.split()).lower()
+        return blake3.blake3(f"{namespace}\x00{normalized}".encode('utf-8')).digest()[:16]
+
+    @staticmethod
+    def _normalize(embedding: np.ndarray) -> np.ndarray:
+        """Float32 unit vector (cosine similarity becomes a dot product)."""
+        embedding = np.asarray(embedding, dtype=np.float32)
+        return embedding / max(float(np.linalg.norm(embedding)), 1e-12)
+
+    def lookup(self, text: str, namespace: str = '') -> Tuple[Optional[Any], Optional[np.ndarray]]:
+        """
+        Look up a cached response for a query.
+
+        Args:
+            text: Query text
+            namespace: Partition key; only entries stored under the same namespace can match
+
+        Returns:
+            Tuple of (cached response or None, query embedding or None).
+            The embedding is returned on a miss so `store` can reuse it.
+        """
+        key = self._key(text, namespace)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self.hits += 1
+                logger.debug("Semantic cache exact hit (hits=%d, misses=%d)", self.hits, self.misses)
+                return entry[1], entry[0]
+
+        # Embed outside the lock (may run the model)
+        embedding = np.asarray(self.embed_fn(text), dtype=np.float32)
+        query = self._normalize(embedding)
+
+        with self._lock:
+            index = self._namespaces.get(namespace)
+            if index is not None and index.keys:
+                scores = index.matrix[:len(index.keys)] @ query
+                # Best live row above the threshold (rows of expired entries are skipped)
+                for row in np.argsort(scores)[::-1]:
+                    if scores[row] < self.threshold:
+                        break
+                    entry = self._entries.get(index.keys[row])
+                    if entry is not None:
+                        self.hits += 1
+                        logger.debug("Semantic cache hit (score=%.3f, hits=%d, misses=%d)",
+                                     scores[row], self.hits, self.misses)
+                        return entry[1], embedding
+
+            self.misses += 1
+            logger.debug("Semantic cache miss (hits=%d, misses=%d)", self.hits, self.misses)
+        return None, embedding
+
+    def store(self, text: str, embedding: np.ndarray, response: Any, namespace: str = ''):
+        """
+        Cache a response for a query.
+
+        Args:
+            text: Query text
+            embedding: Query embedding (as returned by `lookup`)
+            response: Response to cache
+            namespace: Partition key (see `lookup`)
+        """
+        key = self._key(text, namespace)
+        with self._lock:
+            self._entries[key] = (embedding, response)
+            index = self._namespaces.get(namespace)
+            if index is None:
+                index = self._namespaces[namespace] = _NamespaceIndex(len(embedding))
+            index.add(key, self._normalize(embedding), lambda k: k in self._entries)
+            # Drop namespaces whose entries have all expired or been evicted
+            if len(self._namespaces) > 2 * self._entries.maxsize:
+                self._namespaces = {
+                    ns: idx for ns, idx in self._namespaces.items()
+                    if any(k in self._entries for k in idx.keys)
+                }
@@ -13,13 +13,24 @@ The vector store handles:
     4. Result deduplication and ranking
 """
 
-import json
+import ijson
+import orjson
 import os
 import logging
-from typing import List, Dict, Tuple, Optional
+import sqlite3
+from contextlib import closing
+from itertools import islice
+from typing import Iterable, Iterator, List, Dict, Tuple, Optional
+import threading
+from collections import deque
+import blake3
 import numpy as np
+import torch
+from cachetools import LRUCache
 from sentence_transformers import SentenceTransformer
 from pinecone import Pinecone
+from src.embedding_batcher import EmbeddingBatcher
+from src.semantic_cache import SemanticCache
 import time
 from dotenv import load_dotenv
 
@@ -27,6 +38,68 @@ load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+
+def _chunks(iterable: Iterable, n: int) -> Iterator[tuple]:
+    """Yield successive n-sized tuples from any iterable (the last may be shorter)."""
+    it = iter(iterable)
+    while chunk := tuple(islice(it, n)):
+        yield chunk
+
+
+_model_lock = threading.Lock()
+_EMBEDDING_MODEL: Optional[SentenceTransformer] = None
+# Identifies what produced the vectors (model, backend/weights, dtype); see _encode_cached
+_EMBEDDING_VARIANT: Optional[str] = None
+
+
+def _get_embedding_model() -> SentenceTransformer:
+    """
+    Return the process-wide embedding model, loading it on first use, so
+    index-only operations (stats, setup checks) never pay for it.
+    """
+    global _EMBEDDING_MODEL, _EMBEDDING_VARIANT
+    if _EMBEDDING_MODEL is None:
+        with _model_lock:
+            if _EMBEDDING_MODEL is None:
+                # all-MiniLM-L6-v2: Lightweight model (90MB), 384 dimensions, good for semantic search
+                logger.info("Loading embedding model (all-MiniLM-L6-v2)...")
+                cache_dir = os.getenv('HF_HOME', '/tmp/huggingface_cache')
+                os.makedirs(cache_dir, exist_ok=True)
+                hf_token = os.getenv('HF_TOKEN')  # Optional, prevents rate limits
+
+                # EMBED_BACKEND=onnx runs the model's int8-quantized ONNX export on ONNX Runtime
+                # (needs sentence-transformers[onnx]); default is the PyTorch backend
+                backend_kwargs = {}
+                if os.getenv('EMBED_BACKEND') == 'onnx':
+                    backend_kwargs = {
+                        'backend': 'onnx',
+                        'model_kwargs': {'file_name': os.getenv('EMBED_ONNX_FILE', 'onnx/model_qint8_avx512_vnni.onnx')}
+                    }
+
+                model = SentenceTransformer(
+                    'all-MiniLM-L6-v2',
+                    cache_folder=cache_dir,
+                    token=hf_token,
+                    **backend_kwargs
+                )
+                # Explicit intra-op thread cap; otherwise torch uses every core (offline indexing).
+                # The API server defaults it to 1 so workers don't contend (gunicorn_conf.when_ready)
+                if os.getenv('TORCH_NUM_THREADS'):
+                    torch.set_num_threads(int(os.environ['TORCH_NUM_THREADS']))
+                if not backend_kwargs:
+                    model.eval()
+                    # SentenceTransformer picks CUDA when available; EMBED_FP16=1 halves it for tensor cores
+                    if model.device.type == 'cuda' and os.getenv('EMBED_FP16') == '1':
+                        model.half()
+                    weights = f"torch-{next(model.parameters()).dtype}".replace('torch.', '')
+                else:
+                    weights = f"onnx-{backend_kwargs['model_kwargs']['file_name']}"
+                _EMBEDDING_VARIANT = f"all-MiniLM-L6-v2|{weights}"
+                _EMBEDDING_MODEL = model
+                logger.info("Embedding model loaded successfully")
+    return _EMBEDDING_MODEL
+
+
 class VectorStore:
     """
     Handle vector embeddings and similarity search using Pinecone.
@@ -51,26 +124,54 @@ class VectorStore:
         self.metric = metric
         self.upsert_batch_size = upsert_batch_size
         self.embed_batch_size = embed_batch_size
+        # Size of Pinecone's thread pool for async_req upserts (also bounds upserts in flight)
+        self.pool_threads = int(os.getenv('PINECONE_POOL_THREADS', 30))
+        
+        # Optionally coalesce concurrent query embeddings into one forward pass
+        batch_window_ms = float(os.getenv('EMBED_BATCH_WINDOW_MS', 0))
+        self._batcher = None
+        if batch_window_ms > 0:
+            self._batcher = EmbeddingBatcher(
+                lambda texts: self._encode(texts, self.embed_batch_size),
+                window=batch_window_ms / 1000
+            )
+        
+        # Recent query embeddings (model is uncased, so keys are lowercased)
+        self._query_cache = LRUCache(maxsize=1024)
+        self._query_cache_lock = threading.Lock()
         
-        # Initialize embedding model
-        # all-MiniLM-L6-v2: Lightweight model (90MB), 384 dimensions, good for semantic search
-        logger.info("Loading embedding model (all-MiniLM-L6-v2)...")
-        cache_dir = os.getenv('HF_HOME', '/tmp/huggingface_cache')
-        os.makedirs(cache_dir, exist_ok=True)
-        hf_token = os.getenv('HF_TOKEN')  # Optional, prevents rate limits
-
-        self.embedding_model = SentenceTransformer(
-            'all-MiniLM-L6-v2',
-            cache_folder=cache_dir,
-            token=hf_token
+        # Near-duplicate queries (same filters) reuse recent Pinecone results
+        self._result_cache = SemanticCache(
+            self.embed_query,
+            threshold=float(os.getenv('VECTOR_CACHE_THRESHOLD', 0.95)),
+            maxsize=2048,
+            ttl=3600
         )
-        logger.info("Embedding model loaded successfully")
         
-        # Initialize Pinecone
+        # Pinecone client/index are created on first use, per process (see `index`)
         self.pc = None
-        self.index = None
-        self._init_pinecone()
+        self._index = None
+        self._index_pid = None
+        self._index_lock = threading.Lock()
         
+    @property
+    def embedding_model(self) -> SentenceTransformer:
+        """Shared embedding model (loaded on first use)."""
+        return _get_embedding_model()
+
+    @property
+    def index(self):
+        """
+        Pinecone index handle, connected on first use in the current process.
+        The client's HTTP pool and async_req thread pool must not be shared across
+        fork, so a handle created before a (gunicorn) fork is rebuilt in the child.
+        """
+        if self._index is None or self._index_pid != os.getpid():
+            with self._index_lock:
+                if self._index is None or self._index_pid != os.getpid():
+                    self._init_pinecone()
+        return self._index
+
     def _init_pinecone(self):
         """Initialize Pinecone client and index."""
         try:
@@ -81,11 +182,15 @@ class VectorStore:
             # Initialize Pinecone
             self.pc = Pinecone(api_key=api_key)
             
-            # Check if index exists, create if not
-            existing_indexes = [index.name for index in self.pc.list_indexes()]
+            # Check if index exists, create if not (PINECONE_ASSUME_INDEX_EXISTS=1 skips
+            # the list_indexes round-trip on startup for deployments with a provisioned index)
+            if os.getenv('PINECONE_ASSUME_INDEX_EXISTS') == '1':
+                existing_indexes = [self.index_name]
+            else:
+                existing_indexes = [index.name for index in self.pc.list_indexes()]
             
             if self.index_name not in existing_indexes:
-                print(f"Creating Pinecone index: {self.index_name}")
+                logger.info("Creating Pinecone index: %s", self.index_name)
                 self.pc.create_index(
                     name=self.index_name,
                     dimension=self.dimension,
@@ -100,14 +205,25 @@ class VectorStore:
                 # Wait for index to be ready
                 time.sleep(10)
             
-            # Connect to index
-            self.index = self.pc.Index(self.index_name)
+            # Connect to index (pool_threads sizes the pool used by async_req upserts)
+            self._index = self.pc.Index(self.index_name, pool_threads=self.pool_threads)
+            self._index_pid = os.getpid()
             logger.info(f"Connected to Pinecone index: {self.index_name}")
 
         except Exception as e:
             logger.error(f"Error initializing Pinecone: {e}")
             raise
     
+    def _encode(self, texts: List[str], batch_size: int, **kwargs) -> np.ndarray:
+        """
+        Encode texts into a C-contiguous float32 matrix of L2-normalized rows, so
+        cosine similarity downstream (caches, re-ranking) is a plain matmul.
+        Normalizing doesn't change results against the cosine index.
+        """
+        embeddings = self.embedding_model.encode(texts, batch_size=batch_size, convert_to_numpy=True,
+                                                 normalize_embeddings=True, **kwargs)
+        return np.ascontiguousarray(embeddings, dtype=np.float32)
+
     def create_embeddings(self, texts: List[str]) -> np.ndarray:
         """
         Create embeddings for a list of texts.
@@ -118,24 +234,18 @@ class VectorStore:
         Returns:
             Numpy array of embeddings
         """
-        print(f"Creating embeddings for {len(texts)} texts...")
-        embeddings = self.embedding_model.encode(texts, show_progress_bar=True, batch_size=self.embed_batch_size)
+        logger.info("Creating embeddings for %d texts...", len(texts))
+        embeddings = self._encode(texts, self._bulk_batch_size(), show_progress_bar=True)
         return embeddings
 
-    @staticmethod
-    def _price_bucket(price: Optional[float]) -> int:
-        """Compute coarse price bucket for filtering and sorting."""
-        if price is None or price <= 0:
-            return -1
-        if price < 10:
-            return 0
-        if price < 25:
-            return 1
-        if price < 50:
-            return 2
-        if price < 100:
-            return 3
-        return 4
+    # Upper bounds of price buckets 0-3; bucket 4 is >= 100, -1 is missing/non-positive
+    PRICE_BUCKET_EDGES = np.array([10, 25, 50, 100], dtype=np.float64)
+
+    @classmethod
+    def _price_buckets(cls, prices: List) -> np.ndarray:
+        """Compute coarse price buckets for filtering and sorting, for many prices at once."""
+        values = np.array([p if isinstance(p, (int, float)) else -1.0 for p in prices], dtype=np.float64)
+        return np.where(values > 0, np.digitize(values, cls.PRICE_BUCKET_EDGES), -1)
 
     def _build_views_for_product(self, product: Dict) -> List[Dict]:
         """
@@ -165,84 +275,178 @@ class VectorStore:
             f"Description: {description}"
         ]).strip()
 
-        views: List[Dict] = []
-        base_metadata = {
+        metadata_a = {
             'product_id': product_id,
-            'view': '',
+            'view': 'A',
             'title': title[:200],
             'category': category,
             'store': store[:100],
             'price': price if price is not None else 0.0,
-            'price_bucket': self._price_bucket(price if isinstance(price, (int, float)) else None),
+            'price_bucket': -1,  # filled per upsert chunk by _price_buckets
             'rating': rating if rating is not None else 0.0,
             'rating_count': rating_count,
             'image_url': image_url
         }
-
-        views.append({
-            'id': f"{product_id}#A",
-            'text': view_a_text,
-            'metadata': {**base_metadata, 'view': 'A'}
-        })
-        views.append({
-            'id': f"{product_id}#B",
-            'text': view_b_text,
-            'metadata': {**base_metadata, 'view': 'B'}
-        })
-
-        return views
+        # Views differ only in 'view'; one shallow copy instead of two merges
+        metadata_b = metadata_a.copy()
+        metadata_b['view'] = 'B'
+
+        return [
+            {'id': f"{product_id}#A", 'text': view_a_text, 'metadata': metadata_a},
+            {'id': f"{product_id}#B", 'text': view_b_text, 'metadata': metadata_b},
+        ]
     
-    def upsert_products(self, products: List[Dict]) -> bool:
+    def _bulk_batch_size(self) -> int:
+        """Encode batch size for bulk (upsert) embedding; GPUs take larger batches."""
+        if self.embedding_model.device.type == 'cuda':
+            return self.embed_batch_size * 4
+        return self.embed_batch_size
+
+    def _encode_cached(self, texts: List[str]) -> np.ndarray:
+        """
+        Encode texts for upsert, reusing embeddings persisted by earlier runs when
+        EMBED_CACHE_PATH is set (SQLite, keyed by BLAKE3 of model variant + text), so re-indexing
+        an unchanged catalog skips the forward passes.
+        """
+        cache_path = os.getenv('EMBED_CACHE_PATH')
+        if not cache_path:
+            return self._encode(texts, self._bulk_batch_size())
+
+        # Vectors from another model variant (ONNX int8, fp16, ...) or without
+        # L2 normalization must never be reused, so they are part of the key
+        _get_embedding_model()
+        prefix = f"{_EMBEDDING_VARIANT}|l2norm\x00".encode('utf-8')
+        keys = [blake3.blake3(prefix + t.encode('utf-8')).digest()[:16] for t in texts]
+        with closing(sqlite3.connect(cache_path)) as db, db:
+            db.execute("CREATE TABLE IF NOT EXISTS embeddings (key BLOB PRIMARY KEY, vector BLOB)")
+            cached = {}
+            for start in range(0, len(keys), 500):  # stay under SQLite's bound-parameter limit
+                part = keys[start:start + 500]
+                rows = db.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(part))})", part
+                )
+                cached.update(rows)
+
+            embeddings = np.empty((len(texts), self.dimension), dtype=np.float32)
+            missing = []
+            for i, key in enumerate(keys):
+                if key in cached:
+                    embeddings[i] = np.frombuffer(cached[key], dtype=np.float32)
+                else:
+                    missing.append(i)
+
+            if missing:
+                encoded = self._encode([texts[i] for i in missing], self._bulk_batch_size())
+                embeddings[missing] = encoded
+                db.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                    [(keys[i], embeddings[i].tobytes()) for i in missing]
+                )
+            logger.info("Embedding cache: %d reused, %d encoded", len(texts) - len(missing), len(missing))
+        return embeddings
+
+    # Pinecone caps upsert requests at 2 MB / 1000 vectors; stay under with a margin
+    UPSERT_MAX_BYTES = 1_800_000
+    UPSERT_MAX_VECTORS = 1000
+
+    def _upsert_batches(self, vectors: Iterable[Dict]) -> Iterator[List[Dict]]:
+        """
+        Group vectors into upsert requests sized by estimated payload bytes rather than count.
+        Values are sent as JSON numbers (~20 bytes each); metadata is measured exactly.
+        """
+        batch: List[Dict] = []
+        batch_bytes = 0
+        for vector in vectors:
+            size = len(vector['id']) + self.dimension * 20 + len(orjson.dumps(vector['metadata']))
+            if batch and (batch_bytes + size > self.UPSERT_MAX_BYTES or len(batch) >= self.UPSERT_MAX_VECTORS):
+                yield batch
+                batch, batch_bytes = [], 0
+            batch.append(vector)
+            batch_bytes += size
+        if batch:
+            yield batch
+
+    def upsert_products(self, products: Iterable[Dict]) -> bool:
         """
         Upsert products to Pinecone index.
         
         Args:
-            products: List of product dictionaries
+            products: Product dictionaries (any iterable; consumed in a single streaming pass)
             
         Returns:
             True if successful, False otherwise
         """
         try:
-            print(f"Upserting {len(products)} products to Pinecone...")
-
-            # Build views
-            all_views: List[Dict] = []
-            for product in products:
-                all_views.extend(self._build_views_for_product(product))
-
-            # Prepare embedding texts
-            texts = [v['text'] for v in all_views]
-            embeddings = self.create_embeddings(texts)
-
-            vectors_to_upsert = []
-            for view, embedding in zip(all_views, embeddings):
-                vectors_to_upsert.append({
-                    'id': view['id'],
-                    'values': embedding.tolist(),
-                    'metadata': view['metadata']
-                })
-
-            # Upsert in batches
-            total = len(vectors_to_upsert)
+            logger.info("Upserting products to Pinecone...")
+
+            # Pipeline: build and encode a chunk of views, hand its batches to Pinecone
+            # (async), then encode the next chunk while those upserts are in flight.
+            # At most 2 * pool_threads batches are pending, so memory stays bounded
             batch_size = self.upsert_batch_size
-            for i in range(0, total, batch_size):
-                batch = vectors_to_upsert[i:i + batch_size]
-                self.index.upsert(vectors=batch)
-                print(f"Upserted batch {i//batch_size + 1}/{(total - 1)//batch_size + 1}")
-            
-            # Wait for all upserts to complete
-            time.sleep(5)
+            max_in_flight = self.pool_threads * 2
+            pending = deque()
+            batch_count = 0
+            product_count = 0
+            for product_chunk in _chunks(products, batch_size * 2):  # 2 views per product
+                product_count += len(product_chunk)
+                views = [view for product in product_chunk for view in self._build_views_for_product(product)]
+                for view, bucket in zip(views, self._price_buckets([v['metadata']['price'] for v in views])):
+                    view['metadata']['price_bucket'] = int(bucket)
+
+                # Identical view texts (e.g. repeated titles) are encoded once
+                text_to_idx: Dict[str, int] = {}
+                view_to_uniq = [text_to_idx.setdefault(v['text'], len(text_to_idx)) for v in views]
+                embeddings = self._encode_cached(list(text_to_idx))
+                vectors = (
+                    {'id': view['id'], 'values': embeddings[u].tolist(), 'metadata': view['metadata']}
+                    for view, u in zip(views, view_to_uniq)
+                )
+                for batch in self._upsert_batches(vectors):
+                    pending.append(self.index.upsert(vectors=batch, async_req=True))
+                    batch_count += 1
+                    # .get() blocks until the oldest batch is acknowledged and re-raises its error
+                    while len(pending) > max_in_flight:
+                        pending.popleft().get()
+            logger.info("Embedded %d products", product_count)
+
+            while pending:
+                pending.popleft().get()
+            logger.info("Upserted %d batches", batch_count)
             
             # Verify the upsert
             stats = self.index.describe_index_stats()
-            print(f"Index now contains {stats.get('total_vector_count', 'unknown')} vectors")
+            logger.info("Index now contains %s vectors", stats.get('total_vector_count', 'unknown'))
             
             return True
             
         except Exception as e:
-            print(f"Error upserting products: {e}")
+            logger.error("Error upserting products: %s", e)
             return False
     
+    def embed_query(self, query: str) -> np.ndarray:
+        """
+        Embed a single query with the shared embedding model.
+
+        Args:
+            query: Query text
+
+        Returns:
+            Query embedding vector (cached; don't mutate)
+        """
+        key = ' '.join(query.split()).lower()
+        with self._query_cache_lock:
+            embedding = self._query_cache.get(key)
+        if embedding is not None:
+            return embedding
+
+        if self._batcher is not None:
+            embedding = self._batcher.embed(query)
+        else:
+            embedding = self._encode([query], 1)[0]
+        with self._query_cache_lock:
+            self._query_cache[key] = embedding
+        return embedding
+
     def search_similar_products(self,
                               query: str,
                               top_k: int = 10,
@@ -259,76 +463,130 @@ class VectorStore:
 
         Returns:
             List of tuples (product_metadata, similarity_score)
+
+        Raises:
+            Exception: Embedding or Pinecone failures are logged and re-raised, so callers
+                can tell a failed search from one with no matches
         """
         try:
-            # Create embedding for query
-            query_embedding = self.embedding_model.encode([query])[0]
-            
-            # Prepare filter for Pinecone query
-            pinecone_filter = {}
-            if filters:
-                if filters.get('category'):
-                    pinecone_filter['category'] = {'$eq': filters['category']}
-                if filters.get('min_price') is not None:
-                    pinecone_filter['price'] = {'$gte': filters['min_price']}
-                if filters.get('max_price') is not None:
-                    if 'price' in pinecone_filter:
-                        pinecone_filter['price']['$lte'] = filters['max_price']
-                    else:
-                        pinecone_filter['price'] = {'$lte': filters['max_price']}
-                if filters.get('min_rating') is not None:
-                    pinecone_filter['rating'] = {'$gte': filters['min_rating']}
-                if filters.get('price_bucket') is not None:
-                    # allow single int or list
-                    pb = filters['price_bucket']
-                    if isinstance(pb, list):
-                        pinecone_filter['price_bucket'] = {'$in': pb}
-                    else:
-                        pinecone_filter['price_bucket'] = {'$eq': pb}
-            
-            # Query Pinecone
-            query_params = {
-                'vector': query_embedding.tolist(),
-                'top_k': top_k,
-                'include_metadata': True
-            }
-            
-            if pinecone_filter:
-                query_params['filter'] = pinecone_filter
-            
-            results = self.index.query(**query_params)
-
-            # Collapse by product_id and keep best scoring view
-            best_by_product: Dict[str, Tuple[Dict, float]] = {}
-            for match in results.get('matches', []):
-                meta = match.get('metadata', {})
-                pid = meta.get('product_id')
-                score = match.get('score', 0.0)
-
-                # Apply similarity threshold - skip products with low relevance
-                if score < min_similarity:
-                    continue
-
-                if not pid:
-                    # Fallback: try to build a synthetic id from title
-                    pid = f"title::{meta.get('title', '')}"
-                if pid not in best_by_product or score > best_by_product[pid][1]:
-                    best_by_product[pid] = (meta, score)
-
-            # Sort by score and take top_k unique products
-            collapsed = sorted(best_by_product.values(), key=lambda x: x[1], reverse=True)[:top_k]
-
-            # Log top similarity scores for monitoring
-            if collapsed:
-                logger.debug(f"Top {len(collapsed[:5])} results with scores:")
-                for i, (prod, score) in enumerate(collapsed[:5], 1):
-                    logger.debug(f"   {i}. {prod.get('title', 'Unknown')[:50]} - Score: {score:.3f}")
-
-            return collapsed
-            
+            pinecone_filter = self._build_pinecone_filter(filters)
+            namespace = orjson.dumps([pinecone_filter, top_k, min_similarity], option=orjson.OPT_SORT_KEYS).decode()
+            cached, query_embedding = self._result_cache.lookup(query, namespace)
+            if cached is not None:
+                return cached
+
+            results = self._query_index(query_embedding, top_k, pinecone_filter, min_similarity)
+            if results:
+                self._result_cache.store(query, query_embedding, results, namespace)
+            return results
+
         except Exception as e:
-            logger.error(f"Error searching products: {e}", exc_info=True)
-            return []
+            logger.error("Error searching products: %s", e, exc_info=True)
+            raise
+
+    def search_similar_products_batch(self,
+                                    queries: List[str],
+                                    top_k: int = 10,
+                                    filters: Optional[Dict] = None,
+                                    min_similarity: float = 0.3) -> List[List[Tuple[Dict, float]]]:
+        """
+        Search for several queries at once, embedding them in a single forward pass.
+
+        Args:
+            queries: Search query texts
+            top_k: Number of results to return per query
+            filters: Optional filters for metadata (shared by all queries)
+            min_similarity: Minimum cosine similarity score (0-1), default 0.3
+
+        Returns:
+            One list of (product_metadata, similarity_score) tuples per query
+
+        Raises:
+            Exception: Embedding or Pinecone failures (see `search_similar_products`)
+        """
+        try:
+            query_embeddings = self._encode(queries, self.embed_batch_size)
+            pinecone_filter = self._build_pinecone_filter(filters)
+            # Pinecone queries take one vector each
+            return [
+                self._query_index(embedding, top_k, pinecone_filter, min_similarity)
+                for embedding in query_embeddings
+            ]
+
+        except Exception as e:
+            logger.error("Error searching products: %s", e, exc_info=True)
+            raise
+
+    @staticmethod
+    def _build_pinecone_filter(filters: Optional[Dict]) -> Dict:
+        """Translate search filters into a Pinecone metadata filter."""
+        pinecone_filter = {}
+        if filters:
+            if filters.get('category'):
+                pinecone_filter['category'] = {'$eq': filters['category']}
+            if filters.get('min_price') is not None:
+                pinecone_filter['price'] = {'$gte': filters['min_price']}
+            if filters.get('max_price') is not None:
+                if 'price' in pinecone_filter:
+                    pinecone_filter['price']['$lte'] = filters['max_price']
+                else:
+                    pinecone_filter['price'] = {'$lte': filters['max_price']}
+            if filters.get('min_rating') is not None:
+                pinecone_filter['rating'] = {'$gte': filters['min_rating']}
+            if filters.get('price_bucket') is not None:
+                # allow single int or list
+                pb = filters['price_bucket']
+                if isinstance(pb, list):
+                    pinecone_filter['price_bucket'] = {'$in': pb}
+                else:
+                    pinecone_filter['price_bucket'] = {'$eq': pb}
+        return pinecone_filter
+
+    def _query_index(self,
+                     query_embedding: np.ndarray,
+                     top_k: int,
+                     pinecone_filter: Dict,
+                     min_similarity: float) -> List[Tuple[Dict, float]]:
+        """Query Pinecone with an embedding and collapse matches to unique products."""
+        # Query Pinecone
+        query_params = {
+            'vector': query_embedding.tolist(),
+            'top_k': top_k,
+            'include_metadata': True
+        }
+
+        if pinecone_filter:
+            query_params['filter'] = pinecone_filter
+
+        results = self.index.query(**query_params)
+
+        # Collapse by product_id and keep best scoring view
+        best_by_product: Dict[str, Tuple[Dict, float]] = {}
+        for match in results.get('matches', []):
+            meta = match.get('metadata', {})
+            pid = meta.get('product_id')
+            score = match.get('score', 0.0)
+
+            # Apply similarity threshold - skip products with low relevance
+            if score < min_similarity:
+                continue
+
+            if not pid:
+                # Fallback: try to build a synthetic id from title
+                pid = f"title::{meta.get('title', '')}"
+            if pid not in best_by_product or score > best_by_product[pid][1]:
+                best_by_product[pid] = (meta, score)
+
+        # Sort by score and take top_k unique products
+        collapsed = sorted(best_by_product.values(), key=lambda x: x[1], reverse=True)[:top_k]
+
+        # Log top similarity scores for monitoring
+        if collapsed and logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Top %d results with scores:", len(collapsed[:5]))
+            for i, (prod, score) in enumerate(collapsed[:5], 1):
+                logger.debug("   %d. %s - Score: %.3f", i, prod.get('title', 'Unknown')[:50], score)
+
+        return collapsed
 
     def get_index_stats(self) -> Dict:
         """
@@ -340,7 +598,7 @@ class VectorStore:
         try:
             return self.index.describe_index_stats()
         except Exception as e:
-            print(f"Error getting index stats: {e}")
+            logger.error("Error getting index stats: %s", e)
             return {}
 
 
@@ -359,46 +617,47 @@ def setup_vector_store_from_data(data_file: str = "data/processed_products.json"
     
     # Load processed data
     try:
-        with open(data_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        products = data['products']
-        print(f"Loaded {len(products)} products from {data_file}")
-        
         # Check if index is empty
         stats = vector_store.get_index_stats()
         if stats.get('total_vector_count', 0) == 0:
-            print("Index is empty, upserting products...")
-            success = vector_store.upsert_products(products)
+            logger.info("Index is empty, upserting products...")
+            # Stream products from the file straight into the embed/upsert pipeline
+            with open(data_file, 'rb') as f:
+                success = vector_store.upsert_products(ijson.items(f, 'products.item', use_float=True))
             if success:
-                print("✅ Vector store setup complete!")
+                logger.info("✅ Vector store setup complete!")
             else:
-                print("❌ Failed to setup vector store")
+                logger.error("❌ Failed to setup vector store")
         else:
-            print(f"Index already contains {stats['total_vector_count']} vectors")
+            logger.info("Index already contains %s vectors", stats['total_vector_count'])
         
         return vector_store
         
     except FileNotFoundError:
-        print(f"❌ Data file not found: {data_file}")
-        print("Please run data processing first!")
+        logger.error("❌ Data file not found: %s", data_file)
+        logger.error("Please run data processing first!")
         return vector_store
     except Exception as e:
-        print(f"❌ Error setting up vector store: {e}")
+        logger.error("❌ Error setting up vector store: %s", e)
         return vector_store
 
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
     # Test the vector store setup
     vector_store = setup_vector_store_from_data()
     
     # Test search
     if vector_store.index:
-        print("\n🔍 Testing search...")
+        logger.info("\n🔍 Testing search...")
         results = vector_store.search_similar_products("wireless headphones", top_k=3)
         
         for i, (product, score) in enumerate(results):
-            print(f"\n{i+1}. {product['title']} (Score: {score:.3f})")
-            print(f"   Category: {product['category']}")
-            print(f"   Price: ${product['price']}" if product['price'] > 0 else "   Price: Not available")
-            print(f"   Rating: {product['rating']}/5.0 ({product['rating_count']} reviews)")
\ No newline at end of file
+            logger.info("\n%d. %s (Score: %.3f)", i + 1, product['title'], score)
+            logger.info("   Category: %s", product['category'])
+            if product['price'] > 0:
+                logger.info("   Price: $%s", product['price'])
+            else:
+                logger.info("   Price: Not available")
+            logger.info("   Rating: %s/5.0 (%s reviews)", product['rating'], product['rating_count'])
\ No newline at end of file
@@ -31,6 +31,7 @@ export interface Product {
     follow_up_questions?: string[];
     total_found?: number;
     agent_name?: string;
+    // Only the Product Type, Category and Target Audience lines (vision output stops there)
     image_description?: string;
     search_query?: string;
     error?: string;